@@ -1,11 +1,21 @@
-import requests
-from google_auth_oauthlib.flow import InstalledAppFlow
-import sqlite3
+import base64
+import json
+import os
+import threading
+import db_module
 from pathlib import Path
 
-DB_PATH = Path(__file__).parent / "database" / "travel_companion.db"
+# requests and google_auth_oauthlib are imported when they're first needed;
+# the login screen is drawn before either is loaded (see preload()).
+
 CLIENT_SECRET_PATH = Path(__file__).parent / "assets" / "client_secret.json"
 
+# Credentials of the last login (with its refresh token) and who it was,
+# so a relaunch can skip the browser
+SESSION_PATH = Path(__file__).parent / "database" / "session.json"
+
+USERINFO_URL = 'https://www.googleapis.com/userinfo/v2/me'
+
 # Scopes define what data we want from Google
 SCOPES = [
     'https://www.googleapis.com/auth/userinfo.email',
@@ -13,54 +23,148 @@ SCOPES = [
     'openid'
 ]
 
+def preload():
+    """Imports the OAuth stack ahead of the first login."""
+    import requests
+    import google_auth_oauthlib.flow
+
 def google_login_flow():
     """
     Opens browser for Google Login, gets token, fetches user info,
     saves to SQLite, and returns user dict.
     """
+    from google_auth_oauthlib.flow import InstalledAppFlow
     try:
         # 1. Run the OAuth Flow
         # Note: This requires 'client_secret.json' in your folder
         flow = InstalledAppFlow.from_client_secrets_file(
             CLIENT_SECRET_PATH.as_posix(), SCOPES)
-        
+
         # This opens a local browser window for the user to sign in
         creds = flow.run_local_server(port=0)
 
         # 2. Fetch User Info using the credentials
+        # (the ID token already names the user; userinfo is only asked if it doesn't)
         if creds and creds.valid:
-            session = requests.Session()
-            session.headers.update({'Authorization': f'Bearer {creds.token}'})
-            user_info = session.get('https://www.googleapis.com/userinfo/v2/me').json()
-            
-            # 3. Save/Update User in SQLite
-            save_user_to_db(user_info)
-            
+            user_info = _user_from_id_token(creds) or _fetch_userinfo(creds)
+
+            # 3. Save/Update User in SQLite, and remember the session
+            _finish_login(creds, user_info)
+
             return user_info
     except Exception as e:
         print(f"Login Failed: {e}")
         return None
 
+def has_saved_session():
+    session = _read_session()
+    return bool(session and session.get("credentials") and session.get("user"))
+
+def restore_session(on_user_changed=None, on_invalid=None):
+    """
+    Returns the user of the saved session, or None if there is none.
+    The cached token is checked locally; if it has expired, it is refreshed
+    on a background thread and the user is returned right away.
+    on_user_changed(user) is called if the refresh shows a new name/picture,
+    on_invalid() if Google no longer accepts the refresh token.
+    Both are called from the background thread.
+    """
+    session = _read_session()
+    if not session or not session.get("credentials") or not session.get("user"):
+        return None
+
+    from google.oauth2.credentials import Credentials
+    try:
+        creds = Credentials.from_authorized_user_info(session["credentials"], SCOPES)
+    except ValueError as e:
+        print(f"Saved session is unusable: {e}")
+        return None
+
+    if not creds.valid:
+        if not creds.refresh_token:
+            return None
+        threading.Thread(
+            target=_refresh_session, args=(creds, session["user"], on_user_changed, on_invalid), daemon=True
+        ).start()
+    return session["user"]
+
+def clear_session():
+    """Forgets the credentials (on logout). Who logged in last is kept."""
+    session = _read_session()
+    if session and session.get("credentials"):
+        _write_session(None, session.get("user"))
+
+def _refresh_session(creds, cached_user, on_user_changed, on_invalid):
+    from google.auth.exceptions import RefreshError, TransportError
+    from google.auth.transport.requests import Request
+    try:
+        creds.refresh(Request())
+    except RefreshError as e:
+        # Revoked or expired for good: the user has to sign in again
+        print(f"Session expired: {e}")
+        clear_session()
+        if on_invalid:
+            on_invalid()
+        return
+    except TransportError as e:
+        print(f"Session refresh failed (offline?): {e}") # Try again next launch
+        return
+
+    user_info = _user_from_id_token(creds) or cached_user
+    _finish_login(creds, user_info)
+    if user_info != cached_user and on_user_changed:
+        on_user_changed(user_info)
+
+def _finish_login(creds, user_info):
+    # Only write the users table when something actually changed
+    session = _read_session() or {}
+    if session.get("user") != user_info:
+        save_user_to_db(user_info)
+    _write_session(json.loads(creds.to_json()), user_info)
+
+def _user_from_id_token(creds):
+    """The user's email/name/picture from the ID token, or None if it doesn't have them."""
+    if not getattr(creds, "id_token", None):
+        return None
+    try:
+        # Straight from Google's token endpoint over TLS, so no signature check
+        payload = creds.id_token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError) as e:
+        print(f"Unreadable ID token: {e}")
+        return None
+    user_info = {key: claims.get(key) for key in ("email", "name", "picture")}
+    return user_info if all(user_info.values()) else None
+
+def _fetch_userinfo(creds):
+    import requests
+    session = requests.Session()
+    session.headers.update({'Authorization': f'Bearer {creds.token}'})
+    user_info = session.get(USERINFO_URL).json()
+    return {key: user_info.get(key) for key in ("email", "name", "picture")}
+
+def _read_session():
+    try:
+        return json.loads(SESSION_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Could not read the saved session: {e}")
+        return None
+
+def _write_session(credentials, user_info):
+    SESSION_PATH.parent.mkdir(exist_ok=True)
+    tmp_path = SESSION_PATH.with_suffix(".tmp")
+    # Holds a refresh token: readable by this user only
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"credentials": credentials, "user": user_info}, f)
+    os.replace(tmp_path, SESSION_PATH)
+
 def save_user_to_db(user_data):
-    conn = sqlite3.connect(DB_PATH.as_posix())
-    c = conn.cursor()
-    
-    # Insert or Ignore (if user exists)
+    # Insert the user, or update name/picture if they already exist
     email = user_data.get('email')
     name = user_data.get('name')
     picture = user_data.get('picture')
 
-    # Check if user exists
-    c.execute("SELECT * FROM users WHERE email=?", (email,))
-    exists = c.fetchone()
-
-    if not exists:
-        c.execute("INSERT INTO users (email, name, profile_pic) VALUES (?, ?, ?)", 
-                  (email, name, picture))
-    else:
-        # Update info just in case
-        c.execute("UPDATE users SET name=?, profile_pic=? WHERE email=?", 
-                  (name, picture, email))
-
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    db_module.save_user(email, name, picture)
@@ -0,0 +1,227 @@
+"""
+Offline benchmarks for the recommendation and dashboard refresh pipeline.
+
+Runs headless (no Kivy window) against local stand-ins for Google Places,
+OpenWeather and Nominatim, and against synthetic ontologies of growing size.
+Reports p50/p95 latency, API calls and peak Python memory per stage.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 50,1000,100000 --latency-ms 150 --json bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.chdir(REPO_ROOT) # Ontology paths in ontology_module are relative to the repo root
+
+import cache_module
+import context_module
+import database_setup
+import db_module
+import ontology_module
+import pipeline_module
+from stub_server import StubServer
+from synthetic_ontology import write_synthetic_ontology, random_preferences
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PREFERENCES = {
+    "attractions": ["Park", "Museum", "Art Gallery"],
+    "activities": ["Cycling", "Spa & Wellness"],
+    "cuisines": ["Chinese", "Thai"],
+}
+CONDITIONS = ["clear sky", "few clouds", "light rain", "snow"]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def measure(stage, fn, repeat, setup=None, stub=None):
+    """
+    Times fn() `repeat` times, then runs it once more under tracemalloc
+    (tracing slows code down, so it isn't part of the timings).
+    setup() runs before every call and is not timed.
+    """
+    timings = []
+    api_calls = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        if stub:
+            stub.reset_counts()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): # Silence progress prints
+            fn()
+        timings.append((time.perf_counter() - start) * 1000)
+        if stub:
+            api_calls.append(sum(stub.calls.values()))
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "stage": stage,
+        "runs": repeat,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p95_ms": round(percentile(timings, 95), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+    if stub:
+        result["api_calls"] = round(sum(api_calls) / len(api_calls), 1)
+    return result
+
+def bench_ontology(sizes, repeat, max_build_repeat, workdir):
+    results = []
+    rng = random.Random(1)
+    default_paths = (ontology_module.ONTO_PATH, ontology_module.ARTIFACT_PATH)
+
+    for n in sizes:
+        onto_path = Path(workdir) / f"synthetic_{n}.owl"
+        write_synthetic_ontology(onto_path, n)
+        ontology_module.ONTO_PATH = onto_path.as_posix()
+        ontology_module.ARTIFACT_PATH = (Path(workdir) / f"synthetic_{n}.recs.json").as_posix()
+
+        # Parse with Owlready2 + compile + write the artifact (build step, not runtime)
+        build_repeat = max(1, min(max_build_repeat, repeat if n <= 10000 else 1))
+        results.append(measure(f"ontology_build[{n}]", ontology_module.build_recommendation_artifact, build_repeat))
+
+        # What the app does at startup: hash the .owl and read the artifact
+        def reset_index():
+            ontology_module._INDEX_STATE.update(index=None, mtime=None)
+        results.append(measure(f"artifact_load[{n}]", ontology_module.load_recommendation_index, repeat, setup=reset_index))
+
+        index = ontology_module.load_recommendation_index()
+        cases = [
+            ({"condition": rng.choice(CONDITIONS), "hour": rng.randrange(24)},
+             {c: random_preferences(n, rng) for c in ("cuisines", "attractions", "activities")})
+            for _ in range(repeat)
+        ]
+        case_iter = iter(cases * 2)
+        results.append(measure(
+            f"recommend_all[{n}]",
+            lambda: ontology_module.recommend_all(*next(case_iter), ontology=index),
+            repeat
+        ))
+
+        # Same lookups from the SQLite quadstore backend (import once, then reopen)
+        quadstore_path = (Path(workdir) / f"synthetic_{n}.sqlite3").as_posix()
+        def open_quadstore():
+            quadstore = ontology_module.QuadstoreIndex(quadstore_path)
+            quadstore.close()
+        results.append(measure(f"quadstore_import[{n}]", open_quadstore, 1))
+        results.append(measure(f"quadstore_open[{n}]", open_quadstore, repeat))
+
+        quadstore = ontology_module.QuadstoreIndex(quadstore_path)
+        case_iter = iter(cases * 2)
+        results.append(measure(
+            f"recommend_all_quadstore[{n}]",
+            lambda: ontology_module.recommend_all(*next(case_iter), ontology=quadstore),
+            repeat
+        ))
+        check_backends_agree(index, quadstore, cases)
+        quadstore.close()
+
+    ontology_module.ONTO_PATH, ontology_module.ARTIFACT_PATH = default_paths
+    ontology_module._INDEX_STATE.update(index=None, mtime=None)
+    return results
+
+def check_backends_agree(index, quadstore, cases):
+    """Both backends must recommend the same keywords; raises on the first difference."""
+    for weather in ontology_module.WEATHER_NAMES:
+        for time_name in ontology_module.TIME_NAMES:
+            for k in (3, ontology_module.QuadstoreIndex.STORED_TOP_KEYWORDS + 5):
+                expected = index.top_keywords_for_context(weather, time_name, k)
+                actual = quadstore.top_keywords_for_context(weather, time_name, k)
+                if expected != actual:
+                    raise RuntimeError(f"Fallback for {weather}/{time_name} (k={k}) differs: {expected} != {actual}")
+
+    no_preferences = {c: [] for c in ("cuisines", "attractions", "activities")}
+    for context, preferences in cases + [(context, no_preferences) for context, _ in cases]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = ontology_module.recommend_all(context, preferences, ontology=index)
+            actual = ontology_module.recommend_all(context, preferences, ontology=quadstore)
+        if expected != actual:
+            raise RuntimeError(f"recommend_all({context}, {preferences}) differs: {expected} != {actual}")
+
+def bench_refresh(repeat, latency, workdir):
+    stub = StubServer(latency=latency).start()
+    try:
+        # Point every API at the stub server
+        context_module.PLACES_SEARCH_URL = stub.base_url + "/maps/api/place/nearbysearch/json"
+        context_module.WEATHER_URL = stub.base_url + "/data/2.5/weather"
+        context_module.NOMINATIM_DOMAIN = stub.netloc
+        context_module.NOMINATIM_SCHEME = "http"
+
+        # Throwaway database and an in-memory-only response cache
+        db_path = Path(workdir) / "bench.db"
+        database_setup.DB_PATH = db_path
+        db_module.DB_PATH = db_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            database_setup.create_tables()
+        db_module.save_user(BENCH_EMAIL, "Bench User", "")
+        db_module.update_preferences(BENCH_EMAIL, **BENCH_PREFERENCES)
+        cache = cache_module.ResponseCache(db_path=None)
+        context_module.response_cache = cache
+
+        def refresh():
+            return pipeline_module.fetch_dashboard_data(BENCH_EMAIL, 12, "lunch")
+
+        def forget_everything():
+            cache.clear()
+            pipeline_module.clear_last_results()
+
+        results = [
+            measure("refresh_cold", refresh, repeat, setup=forget_everything, stub=stub),
+            measure("refresh_warm", refresh, repeat, stub=stub),
+        ]
+    finally:
+        stub.stop()
+    return results
+
+def print_report(results):
+    header = f"{'stage':<32}{'runs':>6}{'p50 ms':>12}{'p95 ms':>12}{'peak KiB':>12}{'API calls':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        calls = r.get("api_calls", "")
+        print(f"{r['stage']:<32}{r['runs']:>6}{r['p50_ms']:>12}{r['p95_ms']:>12}{r['peak_kib']:>12}{calls:>11}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,1000,10000", help="Comma-separated Place counts (up to 100000)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per stage")
+    parser.add_argument("--build-repeat", type=int, default=3, help="Timed runs for the (slow) ontology build")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Simulated API latency")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_ontology(sizes, args.repeat, args.build_repeat, workdir)
+        results += bench_refresh(args.repeat, args.latency_ms / 1000, workdir)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Startup benchmark: how long `import main` takes before the first frame can
+be drawn, and how long the deferred warm-up (main.warm_up) takes after it.
+
+Every run is a fresh interpreter started with `-X importtime`; the report
+lists the slowest imports of the last run.
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 10 --report importtime.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Runs in the child interpreter; the timings are printed as one JSON line
+CHILD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.warm_up()
+done = time.perf_counter()
+print(json.dumps({"import_main_ms": (imported - start) * 1000, "warm_up_ms": (done - imported) * 1000}))
+"""
+
+def run_once():
+    """Returns (timings dict, raw -X importtime output)."""
+    env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    report = "\n".join(line for line in proc.stderr.splitlines() if line.startswith("import time:"))
+    return timings, report
+
+def parse_importtime(report):
+    """Returns [(self us, cumulative us, depth, module), ...] in the order Python printed them."""
+    imports = []
+    for line in report.splitlines():
+        if "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return imports
+
+def print_slowest(title, imports, top):
+    print(f"\n{title}")
+    print(f"{'module':<40}{'cumulative ms':>15}{'self ms':>10}")
+    for self_us, cumulative_us, _, name in sorted(imports, key=lambda i: i[1], reverse=True)[:top]:
+        print(f"{name:<40}{cumulative_us / 1000:>15.1f}{self_us / 1000:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--report", help="Also write the last run's raw -X importtime output here")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    import_ms = [timings["import_main_ms"] for timings, _ in runs]
+    warm_up_ms = [timings["warm_up_ms"] for timings, _ in runs]
+
+    print(f"{'stage':<26}{'runs':>6}{'median ms':>12}{'min ms':>10}")
+    print("-" * 54)
+    print(f"{'import main (1st frame)':<26}{args.runs:>6}{statistics.median(import_ms):>12.1f}{min(import_ms):>10.1f}")
+    print(f"{'warm_up (background)':<26}{args.runs:>6}{statistics.median(warm_up_ms):>12.1f}{min(warm_up_ms):>10.1f}")
+
+    # Python prints a module after everything it imported, so the lines up
+    # to `main` are the first frame's imports and the rest are the warm-up's
+    _, report = runs[-1]
+    imports = parse_importtime(report)
+    main_at = next(i for i, entry in enumerate(imports) if entry[3] == "main" and entry[2] == 0)
+    print_slowest("Slowest imports before the first frame (direct imports of main):",
+                  [i for i in imports[:main_at] if i[2] == 1], args.top)
+    print_slowest("Slowest imports deferred to the warm-up:",
+                  [i for i in imports[main_at + 1:] if i[2] == 0], args.top)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Request path -> recorded response it replays
+ROUTES = {
+    "/maps/api/place/nearbysearch/json": "nearbysearch.json",
+    "/data/2.5/weather": "weather.json",
+    "/search": "nominatim.json", # Nominatim geocode (geopy)
+}
+
+class StubServer():
+    """
+    Local stand-in for Google Places, OpenWeather and Nominatim.
+    Replays the JSON in benchmarks/fixtures after `latency` seconds and
+    counts how many calls each API received.
+    """
+    def __init__(self, latency=0.08, fixtures_dir=FIXTURES_DIR):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._bodies = {
+            path: (Path(fixtures_dir) / name).read_bytes() for path, name in ROUTES.items()
+        }
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def netloc(self):
+        host, port = self._httpd.server_address
+        return f"{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                body = server._bodies.get(path)
+                with server._lock:
+                    server.calls[path] += 1
+
+                time.sleep(server.latency)
+                if body is None:
+                    body = json.dumps({"error": "unknown endpoint"}).encode()
+                    self.send_response(404)
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass # Keep benchmark output readable
+
+        return Handler
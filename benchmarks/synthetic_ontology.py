@@ -0,0 +1,82 @@
+import random
+
+# Same vocabulary as the survey screens in main.py, plus filler categories
+# so that large catalogs don't collapse onto a handful of names.
+BASE_CATEGORIES = [
+    "Indian", "Chinese", "Japanese", "Korean", "Thai", "Italian", "French",
+    "Mexican", "Middle Eastern", "Vietnamese", "American", "African",
+    "Hiking", "Cycling", "Kayaking", "Boating", "Camping", "Fishing", "Yoga",
+    "Ziplining", "Gym Workout", "Swimming", "Bowling", "Escape Rooms",
+    "VR Gaming", "Spa & Wellness", "Skiing / Snowboarding",
+    "Beach", "Mountain", "Museum", "Art Gallery", "Waterfall", "Park", "Lake",
+    "Riverside", "Historical Monument",
+]
+WEATHERS = ["Sunny", "Cloudy", "Rainy", "Snowy"]
+TIMES = ["Morning", "Afternoon", "Evening", "Night"]
+
+BASE_IRI = "http://www.semanticweb.org/mridu/ontologies/2025/10/untitled-ontology-7"
+
+HEADER = f'''<?xml version="1.0"?>
+<rdf:RDF xmlns="{BASE_IRI}#"
+     xml:base="{BASE_IRI}"
+     xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+     xmlns:owl="http://www.w3.org/2002/07/owl#"
+     xmlns:xsd="http://www.w3.org/2001/XMLSchema#"
+     xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+    <owl:Ontology rdf:about="{BASE_IRI}"/>
+    <owl:ObjectProperty rdf:about="#is_good_for_time"/>
+    <owl:ObjectProperty rdf:about="#is_good_for_weather"/>
+    <owl:DatatypeProperty rdf:about="#has_category"/>
+    <owl:DatatypeProperty rdf:about="#has_keyword"/>
+    <owl:Class rdf:about="#Context"/>
+    <owl:Class rdf:about="#Place"/>
+    <owl:Class rdf:about="#TimeOfDay"><rdfs:subClassOf rdf:resource="#Context"/></owl:Class>
+    <owl:Class rdf:about="#Weather"><rdfs:subClassOf rdf:resource="#Context"/></owl:Class>
+'''
+
+def synthetic_categories(n_places):
+    """Grows the category list with the catalog (~1 category per 20 places)."""
+    extra = max(0, n_places // 20 - len(BASE_CATEGORIES))
+    return BASE_CATEGORIES + [f"Category {i}" for i in range(extra)]
+
+def write_synthetic_ontology(path, n_places, seed=42):
+    """
+    Writes an OWL file shaped like assets/travel_ontology.owl with n_places
+    Place individuals. About 1 in 5 places is good for any weather and
+    1 in 5 for any time, like the hand-made ontology.
+    """
+    rng = random.Random(seed)
+    categories = synthetic_categories(n_places)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for name in WEATHERS:
+            f.write(f'    <owl:NamedIndividual rdf:about="#{name}"><rdf:type rdf:resource="#Weather"/></owl:NamedIndividual>\n')
+        for name in TIMES:
+            f.write(f'    <owl:NamedIndividual rdf:about="#{name}"><rdf:type rdf:resource="#TimeOfDay"/></owl:NamedIndividual>\n')
+
+        for i in range(n_places):
+            category = categories[i % len(categories)]
+            lines = [
+                f'    <owl:NamedIndividual rdf:about="#Place{i}">',
+                '        <rdf:type rdf:resource="#Place"/>',
+                f'        <has_category>{_escape(category)}</has_category>',
+                f'        <has_keyword>{_escape(category.lower())} {i}</has_keyword>',
+            ]
+            if rng.random() > 0.2:
+                for weather in rng.sample(WEATHERS, rng.randint(1, 3)):
+                    lines.append(f'        <is_good_for_weather rdf:resource="#{weather}"/>')
+            if rng.random() > 0.2:
+                for time in rng.sample(TIMES, rng.randint(1, 3)):
+                    lines.append(f'        <is_good_for_time rdf:resource="#{time}"/>')
+            lines.append('    </owl:NamedIndividual>')
+            f.write("\n".join(lines) + "\n")
+
+        f.write("</rdf:RDF>\n")
+
+def random_preferences(n_places, rng, count=4):
+    """A plausible user's preference list for a synthetic catalog."""
+    return rng.sample(synthetic_categories(n_places), count)
+
+def _escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
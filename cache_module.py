@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_DB_PATH = Path(__file__).parent / "database" / "api_cache.db"
+
+# How long each kind of API response stays fresh (seconds)
+CACHE_TTL = {
+    "geocode": 7 * 24 * 3600, # Cities don't move
+    "weather": 3 * 3600,      # Last observation; freshness is decided by its own timestamp (see get_weather)
+    "places": 6 * 3600,       # Nearby places change slowly
+}
+
+# Geohash length per source: 5 chars ~ 5 km cell, 6 chars ~ 1 km cell
+GEOHASH_PRECISION = {
+    "weather": 5,
+    "places": 6,
+}
+
+MAX_MEMORY_ENTRIES = 256
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash(lat, lon, precision=6):
+    """Encodes a coordinate as a geohash string, so nearby points share a cache key."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    use_lon = True
+
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, halving the range each time
+        rng, value = (lon_range, lon) if use_lon else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        use_lon = not use_lon
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+def make_key(source, *parts, lat=None, lon=None):
+    """Builds a cache key like 'places|f25dvk|restaurant|thai lunch'."""
+    key_parts = [source]
+    if lat is not None and lon is not None:
+        key_parts.append(geohash(lat, lon, GEOHASH_PRECISION.get(source, 6)))
+    key_parts.extend("" if part is None else str(part) for part in parts)
+    return "|".join(key_parts)
+
+class ResponseCache():
+    """
+    TTL cache for API responses.
+    Entries live in an in-memory LRU and, if db_path is given, in a SQLite
+    file so that they survive app restarts. Values must be JSON-serializable.
+    The file is opened on first use (or by open()), not on construction.
+    """
+    def __init__(self, db_path=None, max_entries=MAX_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._memory = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db_path = db_path
+        self._conn = None
+
+    def open(self):
+        """Opens the SQLite file now, e.g. from a background thread at startup."""
+        with self._lock:
+            self._connect()
+
+    def _connect(self):
+        # Caller holds the lock. Returns the connection, or None without persistence.
+        if self._db_path is None:
+            return self._conn
+        db_path, self._db_path = Path(self._db_path), None # Only try once
+        try:
+            db_path.parent.mkdir(exist_ok=True)
+            self._conn = sqlite3.connect(db_path.as_posix(), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS api_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            # Drop anything that expired while the app was closed
+            self._conn.execute("DELETE FROM api_cache WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"API cache persistence disabled: {e}")
+            self._conn = None
+        return self._conn
+
+    def get(self, key):
+        """Returns the cached value, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            conn = self._connect()
+            if conn is None:
+                return None
+
+            row = conn.execute(
+                "SELECT value, expires_at FROM api_cache WHERE key=?", (key,)
+            ).fetchone()
+            if not row or row[1] <= now:
+                return None
+
+            value = json.loads(row[0])
+            self._remember(key, row[1], value)
+            return value
+
+    def set(self, key, value, ttl):
+        """Stores value for ttl seconds."""
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+
+            conn = self._connect()
+            if conn is not None:
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO api_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires_at)
+                    )
+                    conn.commit()
+                except sqlite3.Error as e:
+                    print(f"API cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM api_cache")
+                conn.commit()
+
+    def _remember(self, key, expires_at, value):
+        # Caller holds the lock
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False) # Evict least recently used
+
+# Shared cache used by context_module (cheap to create; the file opens on first use)
+response_cache = ResponseCache(CACHE_DB_PATH)
@@ -1,21 +1,104 @@
-import requests
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+from cache_module import response_cache, make_key, CACHE_TTL
+import perf_module
+
+# requests and geopy are only imported when the first request is made, so
+# that importing this module doesn't slow down the app's first frame
+# (preload() does it on a background thread once the window is up).
 
 load_dotenv()
 
+# API endpoints (overridable, e.g. to point the benchmarks at local stand-ins)
+PLACES_SEARCH_URL = os.getenv("PLACES_SEARCH_URL", "https://maps.googleapis.com/maps/api/place/nearbysearch/json")
+PLACE_PHOTO_URL = os.getenv("PLACE_PHOTO_URL", "https://maps.googleapis.com/maps/api/place/photo")
+WEATHER_URL = os.getenv("WEATHER_URL", "https://api.openweathermap.org/data/2.5/weather")
+NOMINATIM_DOMAIN = os.getenv("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_SCHEME = os.getenv("NOMINATIM_SCHEME", "https")
+
+# HTTP settings shared by every API call
+REQUEST_TIMEOUT = (3.05, 10) # (connect, read) seconds
+MAX_CONCURRENT_REQUESTS = 6  # Upper bound on simultaneous Places searches
+
+# Google serves at most 3 pages of 20 results per search
+MAX_RESULT_PAGES = 3
+NEXT_PAGE_TOKEN_DELAY = 2 # seconds before a new next_page_token can be used
+PAGE_TOKEN_TTL = 120 # seconds a next_page_token is trusted; Google expires them long before cached results
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+# Worker pool for concurrent searches (threads are only started when needed)
+_places_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="places")
+
+# Location + weather lookups run on their own worker so the UI thread never waits on them
+_context_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context")
+_context_lock = threading.Lock()
+_context_future = None
+
+def get_http_session():
+    """Returns the shared keep-alive HTTP session, creating it on first use."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            # Keep enough pooled connections open for every concurrent worker
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+# OpenWeather publishes a new observation about every 10 minutes. A cached
+# observation is reused until its "dt" plus this interval has passed.
+# Station data often lags by more than that; then (and after a check that
+# brought nothing new, or failed) the next check waits a whole interval,
+# doubling up to WEATHER_MAX_BACKOFF while nothing changes.
+WEATHER_DATA_INTERVAL = 600
+WEATHER_MIN_RECHECK = 60 # Never ask again sooner than this
+WEATHER_MAX_BACKOFF = 3600
+
+# Cache key -> epoch time of the next attempt, for cells whose lookup failed
+# before any observation was stored
+_weather_retry_at = {}
+
+GEOCODE_QUERY = "Montreal" # currently static for testing purpose
+NO_IMAGE_URL = "https://upload.wikimedia.org/wikipedia/commons/1/14/No_Image_Available.jpg"
+
+def preload():
+    """Imports the HTTP and geocoding stacks and opens the API cache ahead of their first use."""
+    response_cache.open()
+    get_http_session()
+    import geopy.geocoders
+
 def get_location():
+    # Serve the geocode from cache if we looked this city up recently
+    cache_key = make_key("geocode", GEOCODE_QUERY)
+    cached = response_cache.get(cache_key)
+    if cached:
+        perf_module.count("cache.geocode.hit")
+        return tuple(cached)
+    perf_module.count("cache.geocode.miss")
+
+    from geopy.geocoders import Nominatim
+    from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
     try:
         # 1. Set a specific user_agent (helps avoid blocking)
-        geolocator = Nominatim(user_agent="my_travel_companion_app_v1")
+        geolocator = Nominatim(user_agent="my_travel_companion_app_v1", domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME)
         
         # 2. Add 'timeout=10' (wait up to 10 seconds instead of 1)
-        location = geolocator.geocode("Montreal", timeout=10, language='en') #currently static for testing purpose
+        with perf_module.span("api.geocode"):
+            location = geolocator.geocode(GEOCODE_QUERY, timeout=10, language='en')
         
         if location:
-            return (location.latitude, location.longitude, location.address)
+            result = (location.latitude, location.longitude, location.address)
+            response_cache.set(cache_key, list(result), CACHE_TTL["geocode"])
+            return result
         else:
             # Fallback if geocode returns None
             return (45.5017, -73.5673, "Montreal, QC, Canada (Fallback)")
@@ -26,71 +109,312 @@ def get_location():
         return (45.5017, -73.5673, "Montreal, QC, Canada (Offline)")
 
 def get_weather(lat, lon):
+    """
+    Returns (temp, condition) for the coordinate.
+    The last observation for each ~5 km cell is kept and only re-requested
+    once the provider should have a newer one; the request is conditional
+    (If-None-Match / If-Modified-Since) when the provider sent validators.
+    """
+    # Nearby coordinates share one cached observation
+    cache_key = make_key("weather", lat=lat, lon=lon)
+    observation = response_cache.get(cache_key)
+    if not isinstance(observation, dict):
+        observation = None # Missing, or written by an older version of the app
+
+    if observation and time.time() < weather_refresh_at(observation):
+        perf_module.count("cache.weather.hit")
+        return observation["temp"], observation["condition"]
+    if not observation and time.time() < _weather_retry_at.get(cache_key, 0):
+        return 20, "Clear Sky (Offline)" # Failed a moment ago; don't retry yet
+    perf_module.count("cache.weather.miss")
+
     API_KEY = os.getenv("OPENWEATHER_API_KEY")
+    headers = {}
+    if observation and observation.get("etag"):
+        headers["If-None-Match"] = observation["etag"]
+    if observation and observation.get("last_modified"):
+        headers["If-Modified-Since"] = observation["last_modified"]
+
     try:
-        url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&units=metric&appid={API_KEY}"
-        response = requests.get(url, timeout=5) # Good practice to timeout here too
+        url = f"{WEATHER_URL}?lat={lat}&lon={lon}&units=metric&appid={API_KEY}"
+        with perf_module.span("api.weather", conditional=bool(headers)) as request_span:
+            response = get_http_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            request_span.attrs["status"] = response.status_code
+
+        if response.status_code == 304 and observation:
+            # Nothing new since our copy; don't download or parse it again
+            return _weather_unchanged(cache_key, observation)
+
         data = response.json()
         
         if response.status_code == 200:
-            temp = data['main']['temp']
-            condition = data['weather'][0]['description']
-            return temp, condition
+            dt = data.get('dt', time.time())
+            if observation and dt == observation["dt"]:
+                return _weather_unchanged(cache_key, observation) # Same observation, re-sent
+            observation = {
+                "temp": data['main']['temp'],
+                "condition": data['weather'][0]['description'],
+                "dt": dt,
+                "checked_at": time.time(),
+                "unchanged_checks": 0,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            response_cache.set(cache_key, observation, CACHE_TTL["weather"])
+            _weather_retry_at.pop(cache_key, None)
+            return observation["temp"], observation["condition"]
+        elif observation:
+            return _weather_unchanged(cache_key, observation) # Last known weather beats a made-up one
         else:
+            _weather_retry_at[cache_key] = time.time() + WEATHER_DATA_INTERVAL
             return 20, "Clear Sky (API Error)"
             
     except Exception as e:
         print(f"Weather API failed: {e}")
+        if observation:
+            return _weather_unchanged(cache_key, observation)
+        _weather_retry_at[cache_key] = time.time() + WEATHER_DATA_INTERVAL
         return 20, "Clear Sky (Offline)"
 
+def _weather_unchanged(cache_key, observation):
+    # A check that brought nothing new (or failed): note it, so the next one backs off
+    observation = dict(observation, checked_at=time.time(),
+                       unchanged_checks=observation.get("unchanged_checks", 0) + 1)
+    response_cache.set(cache_key, observation, CACHE_TTL["weather"])
+    return observation["temp"], observation["condition"]
+
+def weather_refresh_at(observation):
+    """Epoch time after which the provider should have a newer observation."""
+    expected = observation["dt"] + WEATHER_DATA_INTERVAL
+    if expected > observation["checked_at"]:
+        return max(expected, observation["checked_at"] + WEATHER_MIN_RECHECK)
+    # Overdue (lagging station data, or nothing new last time): wait an
+    # interval, longer for every check in a row that brought nothing new
+    backoff = WEATHER_DATA_INTERVAL * 2 ** min(observation.get("unchanged_checks", 0), 6)
+    return observation["checked_at"] + min(backoff, WEATHER_MAX_BACKOFF)
+
+def seconds_until_weather_update(lat, lon):
+    """How long until get_weather would ask the provider again for this location (0 = now)."""
+    cache_key = make_key("weather", lat=lat, lon=lon)
+    observation = response_cache.get(cache_key)
+    if not isinstance(observation, dict):
+        return max(0, _weather_retry_at.get(cache_key, 0) - time.time())
+    return max(0, weather_refresh_at(observation) - time.time())
+
+def fetch_context():
+    """
+    Starts a background location + weather lookup and returns its Future.
+    The Future resolves to {"lat", "lon", "address", "temp", "condition"}.
+    While a lookup is in flight, every caller gets that same Future.
+    """
+    global _context_future
+    with _context_lock:
+        if _context_future is None or _context_future.done():
+            _context_future = _context_executor.submit(_load_context)
+        return _context_future
+
+@perf_module.timed("context.load")
+def _load_context():
+    lat, lon, address = get_location()
+    temp, condition = get_weather(lat, lon)
+    return {"lat": lat, "lon": lon, "address": address, "temp": temp, "condition": condition}
+
+def build_photo_url(photo_ref, max_width=400):
+    """Builds the Place Photo URL for a photo_reference (None -> placeholder image)."""
+    if not photo_ref:
+        return NO_IMAGE_URL
+    GOOGLE_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+    return (
+        f"{PLACE_PHOTO_URL}"
+        f"?maxwidth={max_width}&photo_reference={photo_ref}&key={GOOGLE_API_KEY}"
+    )
+
 def get_google_places(lat, lon, place_type="restaurant", keyword=None):
     """
-    Fetches places from Google Places API.
+    Fetches places from Google Places API (the first page of results).
     place_type examples: 'restaurant', 'tourist_attraction', 'museum'
     """
+    places, _ = get_google_places_page(lat, lon, place_type, keyword, 0)
+    return places
+
+def get_google_places_page(lat, lon, place_type="restaurant", keyword=None, page=0):
+    """
+    Returns (places, has_more) for one page of a search (up to 20 places).
+    Page n continues from page n-1's next_page_token.
+    """
+    page_data = _load_places_page(lat, lon, place_type, keyword, page)
+    if page_data is None:
+        return [], False
+    places = [dict(place, image=build_photo_url(place["photo_reference"])) for place in page_data["places"]]
+    has_more = bool(page_data["next_page_token"]) and page + 1 < MAX_RESULT_PAGES
+    return places, has_more
+
+def iter_google_places(lat, lon, place_type="restaurant", keyword=None, start_page=0, max_pages=MAX_RESULT_PAGES):
+    """Yields a search's results page by page, only requesting a page when it is asked for."""
+    for page in range(start_page, max_pages):
+        places, has_more = get_google_places_page(lat, lon, place_type, keyword, page)
+        yield places
+        if not has_more:
+            return
+
+def fetch_next_pages(page_iterators):
+    """
+    Advances several iter_google_places() generators at once.
+    Returns (combined places, generators that still have pages).
+    """
+    futures = [_places_executor.submit(perf_module.wrap(next), pages, None) for pages in page_iterators]
+    places = []
+    remaining = []
+    for pages, future in zip(page_iterators, futures):
+        page = future.result()
+        if page is not None:
+            places.extend(page)
+            remaining.append(pages)
+    return places, remaining
+
+def is_places_search_cached(lat, lon, place_type="restaurant", keyword=None):
+    """True if get_google_places would answer this search without an API call."""
+    return response_cache.get(_places_cache_key(lat, lon, place_type, keyword, 0)) is not None
+
+def _places_cache_key(lat, lon, place_type, keyword, page):
+    # Results are cached per ~1 km cell + type + keyword (+ page after the first)
+    parts = [place_type, keyword] + ([page] if page else [])
+    return make_key("places", *parts, lat=lat, lon=lon)
+
+def _load_places_page(lat, lon, place_type, keyword, page, refresh=False):
+    """
+    Returns {"places", "next_page_token", "fetched_at"} from the cache or the
+    API; None on failure. refresh skips the cache (for a new next_page_token).
+    """
+    # The cache holds photo references only, so the API key never goes to disk.
+    cache_key = _places_cache_key(lat, lon, place_type, keyword, page)
+    page_data = None if refresh else response_cache.get(cache_key)
+    if isinstance(page_data, list):
+        page_data = {"places": page_data, "next_page_token": None} # Cached before paging existed
+    if page_data is not None:
+        perf_module.count("cache.places.hit")
+        return page_data
+    perf_module.count("cache.places.miss")
+
+    page_token = None
+    token_is_new = False
+    if page > 0:
+        previous = _load_places_page(lat, lon, place_type, keyword, page - 1)
+        if previous and time.time() - previous.get("fetched_at", 0) > PAGE_TOKEN_TTL:
+            # Its results are still good, but its token has expired: ask again
+            perf_module.count("places.token_refreshed")
+            previous = _load_places_page(lat, lon, place_type, keyword, page - 1, refresh=True)
+            token_is_new = True
+        page_token = previous and previous["next_page_token"]
+        if not page_token:
+            return None
+
+    with perf_module.span("api.places", page=page):
+        page_data = _search_google_places(lat, lon, place_type, keyword, page_token)
+    if page_data is None and page_token and not token_is_new:
+        # The token was rejected anyway: drop the page it came from and retry once with a new one
+        perf_module.count("places.token_refreshed")
+        previous = _load_places_page(lat, lon, place_type, keyword, page - 1, refresh=True)
+        if previous and previous["next_page_token"]:
+            with perf_module.span("api.places", page=page):
+                page_data = _search_google_places(lat, lon, place_type, keyword, previous["next_page_token"])
+    if page_data is None:
+        return None
+    page_data["fetched_at"] = time.time()
+    response_cache.set(cache_key, page_data, CACHE_TTL["places"])
+    return page_data
+
+def _search_google_places(lat, lon, place_type, keyword, page_token=None):
+    """
+    Runs the actual Nearby Search (or fetches the page behind page_token).
+    Returns None on failure so errors aren't cached.
+    """
     GOOGLE_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
     
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    url = PLACES_SEARCH_URL
     
-    params = {
-        "location": f"{lat},{lon}",
-        "radius": 20000,
-        "keyword": keyword,
-        "key": GOOGLE_API_KEY
-    }
+    if page_token:
+        # The token carries the original search; other parameters are ignored
+        params = {"pagetoken": page_token, "key": GOOGLE_API_KEY}
+    else:
+        params = {
+            "location": f"{lat},{lon}",
+            "radius": 20000,
+            "keyword": keyword,
+            "key": GOOGLE_API_KEY
+        }
 
-    if place_type:
-        params["type"] = place_type
+        if place_type:
+            params["type"] = place_type
 
-    if keyword:
-        params["keyword"] = keyword
+        if keyword:
+            params["keyword"] = keyword
     
     try:
-        response = requests.get(url, params=params)
-        results = response.json().get("results", [])
-        
+        response = get_http_session().get(url, params=params, timeout=REQUEST_TIMEOUT)
+        data = response.json()
+        if page_token and data.get("status") == "INVALID_REQUEST":
+            # A fresh next_page_token takes a moment to become valid
+            time.sleep(NEXT_PAGE_TOKEN_DELAY)
+            response = get_http_session().get(url, params=params, timeout=REQUEST_TIMEOUT)
+            data = response.json()
+        if response.status_code != 200 or data.get("status") not in ("OK", "ZERO_RESULTS"):
+            print(f"Places API error: {data.get('status')}")
+            return None
+
         places_data = []
-        for place in results[:10]:  # Limit to 10 items to save API quota
+        for place in data.get("results", []):
             name = place.get("name")
             rating = place.get("rating", "N/A")
             
-            # Get Photo URL if available
-            photo_url = "https://upload.wikimedia.org/wikipedia/commons/1/14/No_Image_Available.jpg" # Default
+            # Keep the photo reference; the URL is built when the result is used
+            photo_ref = None
             if "photos" in place:
                 photo_ref = place["photos"][0]["photo_reference"]
-                photo_url = (
-                    f"https://maps.googleapis.com/maps/api/place/photo"
-                    f"?maxwidth=400&photo_reference={photo_ref}&key={GOOGLE_API_KEY}"
-                )
             
+            location = place.get("geometry", {}).get("location", {})
             places_data.append({
+                "place_id": place.get("place_id"),
                 "name": name,
                 "rating": str(rating),
-                "image": photo_url
+                "photo_reference": photo_ref,
+                "lat": location.get("lat"),
+                "lon": location.get("lng"),
             })
             
-        return places_data
+        return {"places": places_data, "next_page_token": data.get("next_page_token")}
     except Exception as e:
         print(f"Error fetching places: {e}")
-        return []
+        return None
 
+def stream_google_places_batch(lat, lon, searches):
+    """
+    Runs many Places searches concurrently on the shared connection pool and
+    yields (section, search index, places) as each one finishes.
+    searches maps a section name to a list of (place_type, keyword) tuples, e.g.
+    {"restaurants": [("restaurant", "thai lunch")], "attractions": [("", "museum")]}
+    A search that appears more than once is only run once.
+    """
+    targets = {} # (place_type, keyword) -> [(section, index), ...]
+    for section, section_searches in searches.items():
+        for index, search in enumerate(section_searches):
+            targets.setdefault(tuple(search), []).append((section, index))
+
+    futures = {
+        _places_executor.submit(perf_module.wrap(get_google_places), lat, lon, place_type, keyword): (place_type, keyword)
+        for place_type, keyword in targets
+    }
+    for future in as_completed(futures):
+        places = future.result()
+        for section, index in targets[futures[future]]:
+            yield section, index, places
+
+def get_google_places_batch(lat, lon, searches):
+    """
+    Runs many Places searches concurrently (see stream_google_places_batch).
+    Returns {section: combined results}, keeping the order of each section's searches.
+    """
+    pages = {section: [[] for _ in section_searches] for section, section_searches in searches.items()}
+    for section, index, places in stream_google_places_batch(lat, lon, searches):
+        pages[section][index] = places
+    return {section: [place for page in section_pages for place in page] for section, section_pages in pages.items()}
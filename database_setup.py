@@ -3,12 +3,23 @@ from pathlib import Path
 
 DB_PATH = Path(__file__).parent / "database" / "travel_companion.db"
 
+# Bumped whenever migrate() learns a new step (stored in PRAGMA user_version)
+SCHEMA_VERSION = 2
+
+# Legacy comma-joined column -> 'kind' value in user_preferences
+LEGACY_PREFERENCE_COLUMNS = {
+    "attraction_preference": "attraction",
+    "activity_preference": "activity",
+    "cuisine_preference": "cuisine",
+}
+
 def create_tables():
     DB_PATH.parent.mkdir(exist_ok=True)
     conn = sqlite3.connect(DB_PATH.as_posix())
     c = conn.cursor()
 
     # User table
+    # (the *_preference columns are legacy; preferences live in user_preferences)
     c.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,8 +34,74 @@ def create_tables():
     ''')
 
     conn.commit()
+    migrate(conn)
     conn.close()
     print(f"Database initialized at {DB_PATH}")
 
+def migrate(conn):
+    """Brings an existing database up to SCHEMA_VERSION. Safe to call on every start."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    # One explicit transaction so a failed migration leaves the old schema intact
+    with conn:
+        conn.execute("BEGIN")
+        if version < 1:
+            _migrate_to_normalized_preferences(conn)
+        if version < 2:
+            _create_dashboard_snapshots(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def _migrate_to_normalized_preferences(conn):
+    # One row per (user, kind, value) instead of comma-joined strings
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (user_id, kind, value)
+        )
+    ''')
+    # Lets "all users who like Hiking" use an index instead of a LIKE scan
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_preferences_kind_value
+        ON user_preferences (kind, value)
+    ''')
+
+    # Copy the existing comma-joined strings over, keeping the user's order
+    users = conn.execute(
+        "SELECT id, attraction_preference, activity_preference, cuisine_preference FROM users"
+    ).fetchall()
+    rows = []
+    for user_id, *values in users:
+        for kind, value in zip(LEGACY_PREFERENCE_COLUMNS.values(), values):
+            for item in (value or "").split(","):
+                if item.strip():
+                    rows.append((user_id, kind, item.strip()))
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_preferences (user_id, kind, value) VALUES (?, ?, ?)", rows
+    )
+    # Clear the legacy columns so there is a single source of truth
+    conn.execute(
+        "UPDATE users SET attraction_preference=NULL, activity_preference=NULL, cuisine_preference=NULL"
+    )
+    print(f"Migrated {len(rows)} preferences to user_preferences")
+
+def _create_dashboard_snapshots(conn):
+    # Last complete dashboard per (user, ~1 km cell, meal phase), as compact JSON,
+    # shown while the next refresh runs and when it can't reach the APIs
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_snapshots (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            cell TEXT NOT NULL,
+            meal_phase TEXT NOT NULL,
+            saved_at REAL NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (user_id, cell, meal_phase)
+        )
+    ''')
+
 if __name__ == "__main__":
-    create_tables()
\ No newline at end of file
+    create_tables()
@@ -0,0 +1,248 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import database_setup
+import perf_module
+
+DB_PATH = Path(__file__).parent / "database" / "travel_companion.db"
+
+# Open connections are shared through a small pool instead of being kept
+# per thread: most DB work runs on short-lived threads (refreshes,
+# prefetches, logins), which would otherwise open a new connection each time.
+# sqlite3 caches the compiled form of every SQL string per connection, so
+# reusing the constants below means each statement is only prepared once per
+# connection.
+MAX_IDLE_CONNECTIONS = 4
+_pool = [] # Idle connections
+_pool_lock = threading.Lock()
+
+# Schema migrations run once per process, on the first connection
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+# Snapshots older than this are neither shown nor kept
+SNAPSHOT_MAX_AGE = 7 * 24 * 3600 # seconds
+
+# Keys of get_user_preferences() -> 'kind' column of user_preferences
+PREFERENCE_KINDS = {
+    "attractions": "attraction",
+    "activities": "activity",
+    "cuisines": "cuisine",
+}
+
+SELECT_PREFERENCES = (
+    "SELECT p.kind, p.value FROM user_preferences p JOIN users u ON u.id = p.user_id "
+    "WHERE u.email=? ORDER BY p.rowid"
+)
+SELECT_USERS_WITH_PREFERENCE = (
+    "SELECT u.email FROM user_preferences p JOIN users u ON u.id = p.user_id "
+    "WHERE p.kind=? AND p.value=?"
+)
+SELECT_PROFILE_STATUS = "SELECT profile_status FROM users WHERE email=?"
+SELECT_USER_ID = "SELECT id FROM users WHERE email=?"
+INSERT_PREFERENCE = (
+    "INSERT INTO user_preferences (user_id, kind, value) VALUES (?, ?, ?) "
+    "ON CONFLICT (user_id, kind, value) DO NOTHING"
+)
+DELETE_PREFERENCE = "DELETE FROM user_preferences WHERE user_id=? AND kind=? AND value=?"
+MARK_PROFILE_COMPLETE = "UPDATE users SET profile_status=1 WHERE id=? AND profile_status IS NOT 1"
+# Insert, or update an existing user's name/picture, in one statement.
+# The WHERE skips the write entirely when nothing changed, and a missing
+# (NULL) name or picture never overwrites a known one.
+UPSERT_USER = (
+    "INSERT INTO users (email, name, profile_pic) VALUES (?, ?, ?) "
+    "ON CONFLICT (email) DO UPDATE SET "
+    "name=COALESCE(excluded.name, name), profile_pic=COALESCE(excluded.profile_pic, profile_pic) "
+    "WHERE COALESCE(excluded.name, name) IS NOT name "
+    "OR COALESCE(excluded.profile_pic, profile_pic) IS NOT profile_pic"
+)
+
+UPSERT_SNAPSHOT = (
+    "INSERT INTO dashboard_snapshots (user_id, cell, meal_phase, saved_at, data) "
+    "SELECT id, ?, ?, ?, ? FROM users WHERE email=? "
+    "ON CONFLICT (user_id, cell, meal_phase) DO UPDATE SET saved_at=excluded.saved_at, data=excluded.data"
+)
+DELETE_OLD_SNAPSHOTS = "DELETE FROM dashboard_snapshots WHERE saved_at < ?"
+# Any cell when ?3 is NULL
+SELECT_LATEST_SNAPSHOT = (
+    "SELECT s.saved_at, s.data FROM dashboard_snapshots s JOIN users u ON u.id = s.user_id "
+    "WHERE u.email=?1 AND s.meal_phase=?2 AND (?3 IS NULL OR s.cell=?3) AND s.saved_at >= ?4 "
+    "ORDER BY s.saved_at DESC LIMIT 1"
+)
+
+@contextmanager
+def connection():
+    """
+    Lends a connection for the duration of the block: an idle one from the
+    pool, or a new one (in WAL mode). Any thread may use it, one at a time.
+    """
+    with _pool_lock:
+        conn = _pool.pop() if _pool else None
+    if conn is None:
+        conn = _open_connection()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback() # Never hand on a half-done transaction
+        with _pool_lock:
+            if len(_pool) < MAX_IDLE_CONNECTIONS:
+                _pool.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+def _open_connection():
+    DB_PATH.parent.mkdir(exist_ok=True)
+    # Pooled connections move between threads, never used by two at once
+    conn = sqlite3.connect(DB_PATH.as_posix(), timeout=10, cached_statements=64, check_same_thread=False)
+    # WAL lets the UI thread read while a worker thread writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    _ensure_schema(conn)
+    return conn
+
+def _ensure_schema(conn):
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            database_setup.migrate(conn)
+            _schema_ready = True
+
+@contextmanager
+def write_transaction():
+    """
+    Runs the block as one explicit transaction on a pooled connection.
+    BEGIN IMMEDIATE takes the write lock up front, so two threads writing at
+    once queue up instead of failing halfway through.
+    """
+    with connection() as conn:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+def close_connections():
+    """Closes the idle connections (new ones are opened on next use)."""
+    with _pool_lock:
+        idle = list(_pool)
+        _pool.clear()
+    for conn in idle:
+        conn.close()
+
+@perf_module.timed("db.get_user_preferences")
+def get_user_preferences(email):
+    """
+    Returns all three preference lists for a user in a single query:
+    {"attractions": [...], "activities": [...], "cuisines": [...]}
+    """
+    with connection() as conn:
+        return _select_preferences(conn, email)
+
+def _select_preferences(conn, email):
+    prefs = {key: [] for key in PREFERENCE_KINDS}
+    key_for_kind = {kind: key for key, kind in PREFERENCE_KINDS.items()}
+
+    for kind, value in conn.execute(SELECT_PREFERENCES, (email,)):
+        if kind in key_for_kind:
+            prefs[key_for_kind[kind]].append(value)
+    return prefs
+
+@perf_module.timed("db.get_users_with_preference")
+def get_users_with_preference(kind, value):
+    """Emails of every user with a given preference, e.g. ("activity", "Hiking")."""
+    with connection() as conn:
+        rows = conn.execute(SELECT_USERS_WITH_PREFERENCE, (kind, value)).fetchall()
+    return [row[0] for row in rows]
+
+@perf_module.timed("db.get_user_profile_status")
+def get_user_profile_status(email):
+    with connection() as conn:
+        row = conn.execute(SELECT_PROFILE_STATUS, (email,)).fetchone()
+    if not row:
+        print("No user found")
+        return None
+    return row[0]
+
+@perf_module.timed("db.update_preferences")
+def update_preferences(email, attractions, activities, cuisines):
+    """
+    Saves the three preference lists and marks the profile as complete.
+    Only rows that actually changed are inserted or deleted.
+    """
+    with write_transaction() as conn:
+        row = conn.execute(SELECT_USER_ID, (email,)).fetchone()
+        if not row:
+            print("No user found")
+            return
+        user_id = row[0]
+
+        current = _select_preferences(conn, email)
+        new = {"attractions": attractions, "activities": activities, "cuisines": cuisines}
+
+        added, removed = [], []
+        for key, kind in PREFERENCE_KINDS.items():
+            old_values, new_values = set(current[key]), set(new[key])
+            # Iterate the lists (not the sets) so insertion order follows the user's order
+            added.extend((user_id, kind, v) for v in new[key] if v not in old_values)
+            removed.extend((user_id, kind, v) for v in current[key] if v not in new_values)
+
+        conn.executemany(DELETE_PREFERENCE, removed)
+        conn.executemany(INSERT_PREFERENCE, added)
+        conn.execute(MARK_PROFILE_COMPLETE, (user_id,))
+
+@perf_module.timed("db.add_preferences_bulk")
+def add_preferences_bulk(rows):
+    """
+    Inserts many preferences in one transaction, skipping ones that already exist.
+    rows is an iterable of (email, kind, value) tuples.
+    """
+    with write_transaction() as conn:
+        user_ids = {}
+        params = []
+        for email, kind, value in rows:
+            if email not in user_ids:
+                row = conn.execute(SELECT_USER_ID, (email,)).fetchone()
+                user_ids[email] = row[0] if row else None
+            if user_ids[email] is not None:
+                params.append((user_ids[email], kind, value))
+        conn.executemany(INSERT_PREFERENCE, params)
+
+def save_user(email, name, picture):
+    """Inserts a new user or refreshes the name/picture of an existing one."""
+    save_users([(email, name, picture)])
+
+@perf_module.timed("db.save_users")
+def save_users(users):
+    """
+    Inserts or updates many users in one transaction (e.g. an import).
+    users is an iterable of (email, name, picture) tuples.
+    """
+    with write_transaction() as conn:
+        conn.executemany(UPSERT_USER, users)
+
+@perf_module.timed("db.save_snapshot")
+def save_snapshot(email, cell, meal_phase, data):
+    """Stores a dashboard (JSON-serializable) for the user, location cell and meal phase."""
+    now = time.time()
+    payload = json.dumps(data, separators=(",", ":"))
+    with write_transaction() as conn:
+        conn.execute(UPSERT_SNAPSHOT, (cell, meal_phase, now, payload, email))
+        conn.execute(DELETE_OLD_SNAPSHOTS, (now - SNAPSHOT_MAX_AGE,))
+
+@perf_module.timed("db.get_latest_snapshot")
+def get_latest_snapshot(email, meal_phase, cell=None):
+    """
+    Returns (saved_at, data) of the newest snapshot for the user and meal
+    phase, in `cell` if given, or None if there is none.
+    """
+    with connection() as conn:
+        row = conn.execute(
+            SELECT_LATEST_SNAPSHOT, (email, meal_phase, cell, time.time() - SNAPSHOT_MAX_AGE)
+        ).fetchone()
+    if not row:
+        return None
+    return row[0], json.loads(row[1])
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage
+from kivy.metrics import dp
+from context_module import get_http_session, build_photo_url, REQUEST_TIMEOUT
+import perf_module
+
+try:
+    from PIL import Image as PILImage # Optional: used to shrink photos to card size
+except ImportError:
+    PILImage = None
+
+THUMBNAIL_DIR = Path(__file__).parent / "database" / "thumbnails"
+
+# Matches the image area of TravelLocationCard (200dp x ~117dp)
+THUMBNAIL_WIDTH_DP = 200
+THUMBNAIL_HEIGHT_DP = 120
+
+MAX_DOWNLOAD_WORKERS = 3   # Parallel photo downloads
+MAX_TEXTURES_IN_MEMORY = 64 # Cards on screen plus recently scrolled-past ones
+MAX_DECODES_PER_FRAME = 2  # Thumbnails decoded per frame; the rest wait for the next ones
+MAX_THUMBNAILS_ON_DISK = 500
+
+class ImageService():
+    """
+    Loads place photos for the dashboard cards.
+    1. Decoded textures are kept in an in-memory LRU.
+    2. Downscaled thumbnails are stored on disk, named by a hash of the
+       photo_reference, so a photo is only downloaded once.
+    3. Downloads run on a small worker pool and never block the UI thread;
+       decoding is spread over frames, a few thumbnails at a time.
+    The pool (and a prune of old thumbnails) starts with the first download.
+    """
+    def __init__(self, cache_dir=THUMBNAIL_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._textures = OrderedDict() # photo_reference -> Texture (main thread only)
+        self._downloads = {}           # photo_reference -> [callbacks] while downloading
+        self._decodes = OrderedDict()  # photo_reference -> (path, callbacks, redownload) waiting to be decoded (main thread only)
+        self._decode_trigger = Clock.create_trigger(self._decode_queued)
+        self._lock = threading.Lock()
+        self._executor = None # Created by _submit()
+
+    def thumbnail_path(self, photo_ref):
+        digest = hashlib.sha1(photo_ref.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.jpg"
+
+    def get_texture(self, photo_ref):
+        """Returns the decoded texture if it's in memory, else None. Main thread only."""
+        texture = self._textures.get(photo_ref)
+        if texture is not None:
+            self._textures.move_to_end(photo_ref)
+        return texture
+
+    def request(self, photo_ref, callback):
+        """
+        Calls callback(texture) on the main thread once the photo is available.
+        Main thread only.
+        """
+        texture = self.get_texture(photo_ref)
+        if texture is not None:
+            perf_module.count("cache.image.memory_hit")
+            callback(texture)
+            return
+
+        path = self.thumbnail_path(photo_ref)
+        if path.exists():
+            perf_module.count("cache.image.disk_hit")
+            self._queue_decode(photo_ref, path, [callback])
+            return
+        perf_module.count("cache.image.miss")
+
+        with self._lock:
+            if photo_ref in self._downloads:
+                # Already downloading; just wait for the same file
+                self._downloads[photo_ref].append(callback)
+                return
+            self._downloads[photo_ref] = [callback]
+        self._submit(self._download, photo_ref, path)
+
+    def _redownload(self, photo_ref, path, callbacks):
+        # Like request(), for callbacks whose thumbnail on disk failed to decode
+        with self._lock:
+            if photo_ref in self._downloads:
+                self._downloads[photo_ref].extend(callbacks)
+                return
+            self._downloads[photo_ref] = list(callbacks)
+        self._submit(self._download, photo_ref, path)
+
+    def prefetch(self, photo_ref):
+        """
+        Downloads the thumbnail to disk ahead of time (no texture is made).
+        Safe from any thread. Returns True if this started a download.
+        """
+        if self.thumbnail_path(photo_ref).exists():
+            return False
+        with self._lock:
+            if photo_ref in self._downloads:
+                return False
+            self._downloads[photo_ref] = []
+        self._submit(self._download, photo_ref, self.thumbnail_path(photo_ref))
+        return True
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS, thread_name_prefix="images")
+                self._executor.submit(self._prune_disk_cache)
+            executor = self._executor
+        executor.submit(func, *args)
+
+    def _download(self, photo_ref, path):
+        # Ask Google for a photo that is already about card-sized
+        width_px = int(dp(THUMBNAIL_WIDTH_DP))
+        try:
+            with perf_module.span("api.photo"):
+                response = get_http_session().get(
+                    build_photo_url(photo_ref, max_width=width_px), timeout=REQUEST_TIMEOUT
+                )
+            response.raise_for_status()
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(response.content)
+            if PILImage is not None:
+                self._shrink(tmp_path, width_px, int(dp(THUMBNAIL_HEIGHT_DP)))
+            os.replace(tmp_path, path) # Never leave a half-written thumbnail behind
+        except Exception as e:
+            print(f"Photo download failed: {e}")
+            with self._lock:
+                self._downloads.pop(photo_ref, None)
+            return
+
+        with self._lock:
+            callbacks = self._downloads.pop(photo_ref, [])
+        if not callbacks:
+            return # Prefetched; decoded when a card first shows it
+        # Textures must be created on the main thread
+        Clock.schedule_once(lambda dt: self._queue_decode(photo_ref, path, callbacks, redownload=False))
+
+    def _shrink(self, path, width, height):
+        with PILImage.open(path) as img:
+            img = img.convert("RGB")
+            # Scale to cover the card area (FitImage crops the rest)
+            scale = max(width / img.width, height / img.height)
+            if scale < 1:
+                img = img.resize((int(img.width * scale), int(img.height * scale)), PILImage.LANCZOS)
+            img.save(path, "JPEG", quality=85)
+
+    def _queue_decode(self, photo_ref, path, callbacks, redownload=True):
+        # Main thread only
+        queued = self._decodes.get(photo_ref)
+        if queued is not None:
+            queued[1].extend(callbacks)
+            return
+        self._decodes[photo_ref] = (path, list(callbacks), redownload)
+        self._decode_trigger()
+
+    def _decode_queued(self, dt):
+        for _ in range(min(MAX_DECODES_PER_FRAME, len(self._decodes))):
+            photo_ref, (path, callbacks, redownload) = self._decodes.popitem(last=False)
+            self._load_texture(photo_ref, path, callbacks, redownload)
+        if self._decodes:
+            self._decode_trigger() # Next frame
+
+    def _load_texture(self, photo_ref, path, callbacks, redownload=True):
+        # redownload: on a decode failure, fetch the photo again (once; a fresh download isn't retried)
+        try:
+            with perf_module.span("image.decode"):
+                texture = CoreImage(path.as_posix()).texture
+        except Exception as e:
+            print(f"Could not decode thumbnail {path.name}: {e}")
+            try:
+                path.unlink() # Truncated or corrupt; don't serve it again
+            except OSError:
+                pass
+            if redownload:
+                self._redownload(photo_ref, path, callbacks)
+            return
+
+        self._textures[photo_ref] = texture
+        self._textures.move_to_end(photo_ref)
+        while len(self._textures) > MAX_TEXTURES_IN_MEMORY:
+            self._textures.popitem(last=False)
+
+        for callback in callbacks:
+            callback(texture)
+
+    def _prune_disk_cache(self):
+        # Keep the newest thumbnails, drop the rest
+        if not self.cache_dir.exists():
+            return
+        files = sorted(self.cache_dir.glob("*.jpg"), key=lambda f: f.stat().st_mtime, reverse=True)
+        for old_file in files[MAX_THUMBNAILS_ON_DISK:]:
+            try:
+                old_file.unlink()
+            except OSError:
+                pass
+
+# Shared service used by the dashboard (no threads or disk access until first used)
+image_service = ImageService()
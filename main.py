@@ -1,34 +1,40 @@
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
-from kivymd.uix.screenmanager import MDScreenManager
-from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
 from kivy.lang import Builder
 from kivy.core.window import Window
 from kivymd.uix.gridlayout import MDGridLayout
-from kivymd.uix.button import MDRectangleFlatButton, MDRaisedButton
-from kivymd.uix.scrollview import MDScrollView
+from kivymd.uix.button import MDRectangleFlatButton
 from kivy.metrics import dp
-from kivy.utils import get_color_from_hex
 from kivy.clock import Clock
 from kivy.clock import mainthread
 from kivymd.uix.card import MDCard
-from kivy.properties import StringProperty
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.properties import StringProperty, ObjectProperty
 from kivy.properties import BooleanProperty 
 from kivy.graphics import Color, Rectangle
 from kivymd.toast import toast
-from kivymd.uix.list import TwoLineListItem, MDList
+from kivymd.uix.list import TwoLineListItem
 
 # Import your modules
-from context_module import get_location, get_weather, get_google_places
-from ontology_module import load_ontology, get_smart_recommendation
+# (cheap to import: the network, OAuth and ontology stacks behind them load
+# on first use, or earlier on a background thread, see warm_up())
+import context_module
+import auth_module
+from context_module import fetch_context, seconds_until_weather_update, WEATHER_MIN_RECHECK, WEATHER_DATA_INTERVAL, iter_google_places, fetch_next_pages
+from ontology_module import get_context_names, load_recommendation_index
+from pipeline_module import fetch_dashboard_data, prefetch_dashboard_data, get_meal_context, next_boundary, section_fingerprint, merge_places, place_key
+from pipeline_module import save_snapshot, load_snapshot, fill_from_snapshot
+from cache_module import geohash, GEOHASH_PRECISION
 from auth_module import google_login_flow
-import sqlite3
-from pathlib import Path
+import db_module
+import perf_module
+from refresh_module import RefreshScheduler
+from image_module import image_service
+import os
 import threading
 from datetime import datetime
-
-DB_PATH = Path(__file__).parent / "database" / "travel_companion.db"
+from difflib import SequenceMatcher
 
 # Global lists to hold temporary selections
 SELECTED_ATTRACTIONS = []
@@ -52,94 +58,58 @@ ALL_ATTRACTIONS = [
     "Park", "Lake", "Riverside", "Historical Monument"
 ]
 
+# Cards per dashboard section (only the visible ones are actually built).
+# More are added, CARDS_PER_SCROLL at a time, when a carousel is scrolled
+# past LOAD_MORE_AT; further result pages are only requested then.
+MAX_CARDS_PER_SECTION = 30
+CARDS_PER_SCROLL = 10
+LOAD_MORE_AT = 0.85 # scroll_x, 0 = start .. 1 = end
+
+# Pipeline section -> dashboard carousel
+SECTION_CAROUSELS = {
+    "cuisines": "restaurant_list",
+    "attractions": "attraction_list",
+    "activities": "activity_list",
+}
+
+# The next boundary's recommendations are fetched this long before it (but never
+# before the dashboard has been idle for PREFETCH_IDLE_DELAY)
+PREFETCH_LEAD = 15 * 60 # seconds
+PREFETCH_IDLE_DELAY = 10 # seconds
+PREFETCH_THUMBNAILS_PER_SECTION = 3 # About what fits on screen before scrolling
+
+# Show the timing breakdown of the last refresh over the dashboard (see perf_module)
+PERF_OVERLAY = os.getenv("PERF_OVERLAY") == "1"
+
 # Globar attribute for setting hour mannually for testing
+# (None follows the clock)
 HOUR = 3
 
-class run_query():
-    def update_preference(attraction_preference, activity_preference, cuisine_preference, email):
-        conn = sqlite3.connect(DB_PATH.as_posix())
-        c = conn.cursor()
-
-        # Check if user exists
-        c.execute("SELECT * FROM users WHERE email=?", (email,))
-        exists = c.fetchone()
-
-        if not exists:
-            print("No user found")
-        else:
-            # Update info
-            c.execute("UPDATE users SET attraction_preference=?, activity_preference=?, cuisine_preference=?, profile_status=? WHERE email=?", 
-                    (attraction_preference, activity_preference, cuisine_preference, 1, email))
-
-        conn.commit()
-        conn.close()
-
-    def get_user_profile_status(email):
-        conn = sqlite3.connect(DB_PATH.as_posix())
-        c = conn.cursor()
-
-        # Check if user exists
-        c.execute("SELECT profile_status FROM users WHERE email=?", (email,))
-        exists = c.fetchone()
-
-        if not exists:
-            print("No user found")
-        else:
-            return exists[0]
-
-        conn.commit()
-        conn.close()
-
-    def get_user_cuisine_preferences(email):
-        conn = sqlite3.connect(DB_PATH.as_posix())
-        c = conn.cursor()
-        c.execute("SELECT cuisine_preference FROM users WHERE email=?", (email,))
-        data = c.fetchone()
-        conn.close()
-        
-        if data:
-            # Join all strings and split by comma to get a single list of keywords
-            # Example: "Hiking, Museum" + "Italian" -> ["Hiking", "Museum", "Italian"]
-            prefs = []
-            for item in data:
-                if item:
-                    prefs.extend([x.strip() for x in item.split(",")])
-            return prefs
-        return []
-
-    def get_user_attraction_preferences(email):
-        conn = sqlite3.connect(DB_PATH.as_posix())
-        c = conn.cursor()
-        c.execute("SELECT attraction_preference FROM users WHERE email=?", (email,))
-        data = c.fetchone()
-        conn.close()
-        
-        if data:
-            # Join all strings and split by comma to get a single list of keywords
-            # Example: "Hiking, Museum" + "Italian" -> ["Hiking", "Museum", "Italian"]
-            prefs = []
-            for item in data:
-                if item:
-                    prefs.extend([x.strip() for x in item.split(",")])
-            return prefs
-        return []
-
-    def get_user_activity_preferences(email):
-        conn = sqlite3.connect(DB_PATH.as_posix())
-        c = conn.cursor()
-        c.execute("SELECT activity_preference FROM users WHERE email=?", (email,))
-        data = c.fetchone()
-        conn.close()
-        
-        if data:
-            # Join all strings and split by comma to get a single list of keywords
-            # Example: "Hiking, Museum" + "Italian" -> ["Hiking", "Museum", "Italian"]
-            prefs = []
-            for item in data:
-                if item:
-                    prefs.extend([x.strip() for x in item.split(",")])
-            return prefs
-        return []
+def current_time():
+    """Now, on the app's clock (its hour pinned to HOUR when that is set)."""
+    now = datetime.now()
+    return now if HOUR is None else now.replace(hour=HOUR)
+
+def current_hour():
+    return current_time().hour
+
+def seconds_until_boundary():
+    """Seconds until the next meal phase / time of day change, or None while HOUR pins the clock."""
+    if HOUR is not None:
+        return None # The phase can't change, so there's nothing to wake up for
+    now = current_time()
+    return (next_boundary(now) - now).total_seconds()
+
+def warm_up():
+    """
+    Loads what the login screen doesn't need, so that it isn't loaded on
+    first use instead: HTTP + geocoding, OAuth, and the recommendation index.
+    """
+    for preload in (context_module.preload, auth_module.preload, load_recommendation_index):
+        try:
+            preload()
+        except Exception as e:
+            print(f"Warm-up step failed: {e}")
 
 class LoginScreen(MDScreen):
     def do_login(self):
@@ -151,40 +121,41 @@ class LoginScreen(MDScreen):
     def _run_login_thread(self):
         user_info = google_login_flow()
         if user_info:
-            # Switch to dashboard on main thread logic
-            app = MDApp.get_running_app()
-            app.current_user_email = user_info['email']
-            app.current_user_name = user_info['name']
-            
-            # Trigger screen switch
-            self.on_login_success(user_info)
+            self.start_session(user_info)
         else:
             self.ids.status_label.text = "Login Failed. Try again."
 
-    def get_icon_map(self, condition):
-        condition = condition.lower()
-        # Format: (Icon Name, Color Tuple RGBA)
-        if "clear" in condition:
-            return "weather-sunny", (1, 0.8, 0.3, 1) # Yellow/Orange
-        elif "few clouds" in condition:
-            return "weather-partly-cloudy", (1, 0.8, 0.3, 1)
-        elif "scattered clouds" in condition or "broken clouds" in condition:
-            return "weather-cloudy", (0.6, 0.6, 0.6, 1) # Grey
-        elif "shower rain" in condition or "rain" in condition:
-            return "weather-rainy", (0.3, 0.3, 0.5, 1) # Blue-grey
-        elif "thunderstorm" in condition:
-            return "weather-lightning", (0.2, 0.2, 0.4, 1) # Dark blue
-        elif "snow" in condition:
-            return "weather-snowy", (0.8, 0.9, 1, 1) # Light blue/white
-        elif "mist" in condition or "fog" in condition:
-            return "weather-fog", (0.7, 0.7, 0.7, 1) # Light grey
+    def restore_session(self):
+        # Runs on a background thread at startup: a saved session skips the browser
+        user_info = auth_module.restore_session(
+            on_user_changed=lambda user_info: Clock.schedule_once(lambda dt: self.show_user(user_info)),
+            on_invalid=self.on_session_expired
+        )
+        if user_info:
+            self.start_session(user_info)
         else:
-            # Default backup
-            return "weather-cloudy", (0.6, 0.6, 0.6, 1)
+            self.set_status("")
+
+    def start_session(self, user_info):
+        # Switch to dashboard on main thread logic
+        app = MDApp.get_running_app()
+        app.current_user_email = user_info['email']
+        app.current_user_name = user_info['name']
+
+        # Trigger screen switch
+        self.on_login_success(user_info)
 
     @mainthread
-    def on_login_success(self, user_info):
-        # This runs on the MAIN UI THREAD (Safe for UI updates, Ex: Picture)
+    def set_status(self, text):
+        self.ids.status_label.text = text
+        self.ids.google_button.disabled = bool(text)
+
+    @mainthread
+    def on_session_expired(self):
+        MDApp.get_running_app().logout()
+        self.ids.status_label.text = "Session expired. Please sign in again."
+
+    def show_user(self, user_info):
         dashboard = self.manager.get_screen("dashboard")
         profile = self.manager.get_screen("profile")
 
@@ -192,29 +163,26 @@ class LoginScreen(MDScreen):
         dashboard.ids.profile_image.source = user_info['picture']
         profile.ids.user_name.text = user_info['name']
         profile.ids.profile_image.source = user_info['picture']
+
+    @mainthread
+    def on_login_success(self, user_info):
+        # This runs on the MAIN UI THREAD (Safe for UI updates, Ex: Picture)
+        dashboard = self.manager.get_screen("dashboard")
+        self.show_user(user_info)
         
         # Configuring login button based on successful login attempt 
         self.ids.status_label.text = ""
         self.ids.google_button.disabled = False
 
         # Location and Weather Information
-        lat, lon, address = get_location()
-        temp, condition = get_weather(lat, lon)
-
-        # Update labels
-        dashboard.ids.weather_temp_label.text = f"{int(round(temp))}°C"
-        # Shorten address to just city if possible, roughly
-        city_name = address.split(",")[0] if "," in address else address
-        dashboard.ids.weather_loc_label.text = city_name
-
-        # Determine icon and color based on condition
-        icon_name, icon_color = self.get_icon_map(condition)
-
-        # Update icon widget
-        dashboard.ids.weather_icon.icon = icon_name
-        dashboard.ids.weather_icon.text_color = icon_color
+        # The lookup runs in the background; the dashboard shows placeholders
+        # until it arrives (and its own refresh joins this same lookup).
+        dashboard.show_weather_placeholder()
+        fetch_context().add_done_callback(
+            lambda future: Clock.schedule_once(lambda dt: dashboard.on_context_ready(future))
+        )
 
-        if run_query.get_user_profile_status(user_info['email']) == 0:
+        if db_module.get_user_profile_status(user_info['email']) == 0:
             self.manager.current = "attractions_selection"
         else:
             self.manager.current = "dashboard"
@@ -330,42 +298,77 @@ class CuisinesSelectionScreen(MDScreen):
     def go_to_dashboard(self):
         # Update user preference in DB
         app = MDApp.get_running_app()
-        attraction_preference = ", ".join(SELECTED_ATTRACTIONS)
-        activities_preference = ", ".join(SELECTED_ACTIVITIES)
-        cuisine_preference = ", ".join(SELECTED_CUISINES)
-        run_query.update_preference(attraction_preference, activities_preference, cuisine_preference, app.current_user_email)
+        db_module.update_preferences(app.current_user_email, SELECTED_ATTRACTIONS, SELECTED_ACTIVITIES, SELECTED_CUISINES)
 
         # Simply switch to the dashboard screen after the survey is 'complete'
         self.manager.current = "dashboard"
 
-class TravelLocationCard(MDCard):
-    source = StringProperty()
+class TravelLocationCard(RecycleDataViewBehavior, MDCard):
+    source = ObjectProperty(None, allownone=True) # Image path/URL, a Texture from the image cache, or None (not loaded yet)
+    photo_reference = StringProperty("", allownone=True)
+    place_id = StringProperty("", allownone=True)
     text = StringProperty()
     sub_text = StringProperty()
 
+    def refresh_view_attrs(self, rv, index, data):
+        super().refresh_view_attrs(rv, index, data)
+        # Only the cards on screen ask for their photo. Textures aren't kept
+        # in carousel.data, so the image cache's LRU is what bounds them.
+        photo_ref = data.get("photo_reference")
+        if photo_ref and data.get("source") is None:
+            texture = image_service.get_texture(photo_ref)
+            if texture is not None:
+                self.source = texture
+            else:
+                image_service.request(photo_ref, lambda texture: self._on_texture(photo_ref, texture))
+
+    def _on_texture(self, photo_ref, texture):
+        if self.photo_reference == photo_ref: # Not recycled for another place meanwhile
+            self.source = texture
+
+    def on_source(self, instance, value):
+        # FitImage keeps drawing the last texture when its source becomes None,
+        # which would show the previous place's photo on a recycled card
+        if value is None and self.ids:
+            container = self.ids.place_image._container
+            if container is not None:
+                container.canvas.clear()
+
 class DashboardScreen(MDScreen):
     current_meal_phase = StringProperty("") # Tracks current phase to avoid unnecessary reloads
-    auto_refresh_event = None # To store the clock schedule
+    boundary_event = None # One-shot wakeup at the next meal phase / time of day change
+    location_cell = None # Geohash cell the shown recommendations are for
+    section_fingerprints = None # carousel id -> section_fingerprint() of what it shows
+    section_paging = None # carousel id -> cards not shown yet + where to get more
+    refresher = None # RefreshScheduler: one fetch in flight, stale results dropped
+    weather_bucket = None # Weather individual (Sunny/Cloudy/...) the shown recommendations are for
+    weather_event = None # Next weather check, due when the provider has a new observation
+    prefetch_event = None # Idle-time prefetch of the next boundary
 
     def on_enter(self):
         self.set_dynamic_greeting()
 
+        # The last dashboard saved for this meal phase goes up right away
+        # (no network involved); the refresh below then replaces it
+        self.show_snapshot()
+
         # Trigger data loading when screen is shown
         self.load_data()
+        self.watch_weather()
 
-        # 2. Schedule a check every 60 seconds to see if meal time changed
-        self.auto_refresh_event = Clock.schedule_interval(self.check_time_and_refresh, 30)
+        # Nothing changes between the boundaries of the hour tables (weather
+        # and location changes are picked up by watch_weather), so sleep until the next one
+        self.schedule_boundary_wakeup()
 
     def set_dynamic_greeting(self):
         # Get current hour (0-23)
-        # current_hour = datetime.now().hour
-        current_hour = HOUR
+        hour = current_hour()
 
-        if 5 <= current_hour < 12:
+        if 5 <= hour < 12:
             greeting = "Good Morning"
-        elif 12 <= current_hour < 17:
+        elif 12 <= hour < 17:
             greeting = "Good Afternoon"
-        elif 17 <= current_hour < 21:
+        elif 17 <= hour < 21:
             greeting = "Good Evening"
         else:
             greeting = "Greetings"
@@ -374,20 +377,32 @@ class DashboardScreen(MDScreen):
 
     def on_leave(self):
         # Stop the clock when leaving dashboard to save resources
-        if self.auto_refresh_event:
-            Clock.unschedule(self.auto_refresh_event)
-
-    def check_time_and_refresh(self, dt):
-        # --- TEST CODE: TOGGLE TIME AUTOMATICALLY ---
-        global HOUR
-        if HOUR == 12:
-            print("Time Travel: Switching to Dinner (19:00)")
-            HOUR = 19  # Force change to Dinner
-        else:
-            print("Time Travel: Switching to Lunch (12:00)")
-            HOUR = 12  # Force change back to Lunch
-        # --------------------------------------------
+        if self.boundary_event:
+            self.boundary_event.cancel()
+        if self.weather_event:
+            self.weather_event.cancel()
+        if self.prefetch_event:
+            self.prefetch_event.cancel()
+
+        # Drop queued refreshes and ignore whatever is still in flight
+        if self.refresher:
+            self.refresher.cancel()
+
+    def schedule_boundary_wakeup(self):
+        if self.boundary_event:
+            self.boundary_event.cancel()
+        delay = seconds_until_boundary()
+        if delay is None:
+            return
+        # A second late, so the new hour has certainly started
+        self.boundary_event = Clock.schedule_once(self.on_boundary, delay + 1)
 
+    def on_boundary(self, dt):
+        self.set_dynamic_greeting()
+        self.check_time_and_refresh()
+        self.schedule_boundary_wakeup()
+
+    def check_time_and_refresh(self):
         # Calculate what the phase SHOULD be right now
         new_phase, _, _ = self.get_meal_context()
         
@@ -396,12 +411,12 @@ class DashboardScreen(MDScreen):
             print(f"Time changed to {new_phase}. Refreshing data...")
 
             app = MDApp.get_running_app()
-            current_time = datetime.now().strftime("%I:%M %p")
+            time_label = current_time().strftime("%I:%M %p")
             
             # Create the notification dictionary
             new_note = {
                 "title": f"New Recommendations: {new_phase}",
-                "time": f"Updated at {current_time}. Check out new spots!"
+                "time": f"Updated at {time_label}. Check out new spots!"
             }
             
             # Add to the global list
@@ -413,7 +428,9 @@ class DashboardScreen(MDScreen):
             # Optional: Show a small toast popup on screen
             toast("New recommendations available!")
 
-            self.load_data()
+        # Also covers a TimeOfDay change within a meal phase; if nothing the
+        # recommendations depend on changed, this is answered from memory
+        self.load_data()
 
     def open_notifications(self):
         # Hide the red dot
@@ -423,112 +440,354 @@ class DashboardScreen(MDScreen):
 
     def get_meal_context(self):
         """Returns (Phase Name, Display Title, API Keyword)"""
-        # hour = datetime.now().hour
-        hour = HOUR # right now its static for testing purpose
-        
-        if 5 <= hour < 11:
-            return "Breakfast", "Morning Fuel", "breakfast"
-        elif 11 <= hour < 15:
-            return "Lunch", "Lunch Spots", "lunch"
-        elif 15 <= hour < 18:
-            return "Snacks", "Afternoon Snacks", "cafe"
-        elif 18 <= hour < 22:
-            return "Dinner", "Dinner Time", "dinner"
-        else:
-            return "LateNight", "Late Night Eats", "late night food"
+        hour = current_hour()
+        return get_meal_context(hour)
 
-    def load_data(self):
-        # Run in thread to prevent UI freeze
-        threading.Thread(target=self._fetch_all_data).start()
+    def show_snapshot(self):
+        app = MDApp.get_running_app()
+        phase, title, _ = self.get_meal_context()
+        # Before the first weather check the location isn't known: any cell will do
+        with perf_module.span("ui.show_snapshot"):
+            data = load_snapshot(app.current_user_email, phase, self.location_cell)
+            if data is not None:
+                self.show_sections(data["restaurants"], data["attractions"], data["activities"],
+                                   title, self._paging(data))
 
-    def _fetch_all_data(self):
+    def load_data(self):
+        # Runs in a background thread to prevent UI freeze.
+        # Bursts of calls are coalesced and never overlap (see RefreshScheduler).
+        if self.refresher is None:
+            self.refresher = RefreshScheduler(self._fetch_all_data, self._apply_refresh)
+        self.refresher.request()
+
+    def _fetch_all_data(self, generation):
+        # Timed as one "refresh" trace, finished once update_ui has drawn the result
+        trace = perf_module.start_span("refresh")
+        try:
+            with perf_module.activate(trace):
+                result = self._load_dashboard(generation, trace)
+        except Exception:
+            perf_module.finish(trace, failed=True)
+            raise
+        if result is None:
+            perf_module.finish(trace, stale=True)
+            return None
+        return result, trace
+
+    def _apply_refresh(self, result):
+        ui_args, trace = result
+        with perf_module.activate(trace), perf_module.span("ui.update_ui"):
+            self.update_ui(*ui_args)
+        perf_module.finish(trace)
+        if PERF_OVERLAY:
+            self.ids.perf_overlay.text = perf_module.format_trace(trace)
+            self.ids.perf_overlay.opacity = 1
+
+    def _load_dashboard(self, generation, trace):
         app = MDApp.get_running_app()
 
-        # A. Context Data
-        lat, lon, address = get_location()
-        temp, condition = get_weather(lat, lon)
-        # hour = datetime.now().hour
-        hour = HOUR # right now its static for testing purpose
-
-        # 2. Get User Preferences from DB
-        user_cuisine_prefs = run_query.get_user_cuisine_preferences(app.current_user_email)
-        user_attraction_prefs = run_query.get_user_attraction_preferences(app.current_user_email)
-        user_activity_prefs = run_query.get_user_activity_preferences(app.current_user_email)
-
-        # 3. ONTOLOGY REASONING
-        # We ask the ontology what to do based on Weather + Time + User Prefs
-        ontology = load_ontology()
-
-        # This returns a list of keywords like ['museum', 'italian restaurant']
-        smart_cuisine_keywords = get_smart_recommendation(ontology, condition, hour, user_cuisine_prefs)
-        smart_attraction_keywords = get_smart_recommendation(ontology, condition, hour, user_attraction_prefs)
-        smart_activity_keywords = get_smart_recommendation(ontology, condition, hour, user_activity_prefs)
-        
-        # B. Time-Based Logic
+        hour = current_hour()
+
+        # Time-Based Logic
         phase, title, keyword = self.get_meal_context()
         
         # Store current phase so we know when it changes later
         self.current_meal_phase = phase
+        trace.attrs["phase"] = phase
+
+        # Context -> preferences -> ontology -> Places (see pipeline_module).
+        # Cards are shown as each search comes in, not when the last one does.
+        data = fetch_dashboard_data(
+            app.current_user_email, hour, keyword,
+            is_stale=lambda: self.refresher.is_stale(generation),
+            on_batch=lambda section, places: Clock.schedule_once(
+                lambda dt: self._apply_batch(generation, section, places, title, trace)
+            )
+        )
+        if data is None:
+            return None
 
-        # C. Places Data - Pass the 'keyword' to Google
-        # Make sure your get_google_places accepts the 4th argument!
-        cuisines_data = []
-        if not user_cuisine_prefs:
-            cuisines_data = get_google_places(lat, lon, "restaurant", keyword)
-        else:
-            for key in smart_cuisine_keywords:
-                # We search specifically for what the ontology suggested
-                results = get_google_places(lat, lon, "restaurant", key+" "+keyword)
-                cuisines_data.extend(results)
-        
-        # Get Attractions (Smart logic: Ontology based)
-        # We loop through the smart keywords provided by the ontology
-        attractions_data = []
-        if not user_cuisine_prefs:
-            attractions_data = get_google_places(lat, lon, "tourist_attraction", "")
-        else:
-            for key in smart_attraction_keywords:
-                # We search specifically for what the ontology suggested
-                results = get_google_places(lat, lon, "", key)
-                attractions_data.extend(results)
-
-        # Get Activities (General fallback + Smart logic if needed)
-        activities_data = []
-        if not user_cuisine_prefs:
-            activities_data = get_google_places(lat, lon, "tourist_attraction", "activity")
+        # Kept for the next start; offline (empty sections) the last one fills the gaps
+        save_snapshot(app.current_user_email, phase, data)
+        data = fill_from_snapshot(app.current_user_email, phase, data)
+
+        # Handed to update_ui on the Main Thread by the scheduler
+        return (
+            data["address"], data["temp"], data["condition"],
+            data["restaurants"], data["attractions"], data["activities"], title, self._paging(data)
+        )
+
+    def _paging(self, data):
+        # Searches behind each carousel, for loading further pages on scroll
+        return {
+            SECTION_CAROUSELS[section]: [(data["lat"], data["lon"], place_type, keyword)
+                                         for place_type, keyword in section_searches]
+            for section, section_searches in data["searches"].items()
+        }
+
+    def _apply_batch(self, generation, section, places, meal_title, trace):
+        # A search that failed (e.g. offline) doesn't clear what's shown;
+        # update_ui decides once all of them are in
+        if self.refresher.is_stale(generation) or not places:
+            return
+        with perf_module.span("ui.apply_batch", parent=trace, section=section):
+            if section == "cuisines":
+                self.ids.restaurant_header.text = meal_title
+            self.populate_section(SECTION_CAROUSELS[section], places)
+
+    def schedule_prefetch(self):
+        if self.prefetch_event:
+            self.prefetch_event.cancel()
+        until_boundary = seconds_until_boundary()
+        if until_boundary is None:
+            return
+        delay = max(PREFETCH_IDLE_DELAY, until_boundary - PREFETCH_LEAD)
+        self.prefetch_event = Clock.schedule_once(self.prefetch_next_boundary, delay)
+
+    def prefetch_next_boundary(self, dt):
+        # Wait until the dashboard's own refresh is done
+        if self.refresher and self.refresher.is_busy():
+            self.schedule_prefetch()
+            return
+
+        # Exactly what the refresh at the next boundary will ask for: its meal
+        # phase and its hour (a TimeOfDay-only boundary keeps the meal phase)
+        boundary_hour = next_boundary(current_time()).hour
+        _, _, keyword = get_meal_context(boundary_hour)
+        email = MDApp.get_running_app().current_user_email
+        threading.Thread(target=self._run_prefetch, args=(email, boundary_hour, keyword), daemon=True).start()
+
+    def _run_prefetch(self, email, hour, keyword):
+        # The results are remembered by pipeline_module, so the refresh at the
+        # boundary is answered without reasoning or searches
+        try:
+            data, budget_left = prefetch_dashboard_data(email, hour, keyword)
+        except Exception as e:
+            print(f"Prefetch failed: {e}")
+            return
+        if data is None:
+            perf_module.count("prefetch.skipped_budget")
+            return
+
+        # Spend what's left of the budget on the photos shown first
+        for section in ("restaurants", "attractions", "activities"):
+            for place in data[section][:PREFETCH_THUMBNAILS_PER_SECTION]:
+                if budget_left <= 0:
+                    break
+                if place.get('photo_reference') and image_service.prefetch(place['photo_reference']):
+                    budget_left -= 1
+        perf_module.count("prefetch.done")
+
+    def show_weather_placeholder(self):
+        self.ids.weather_temp_label.text = "--°C"
+        self.ids.weather_loc_label.text = "Locating..."
+
+    def on_context_ready(self, future):
+        # Called on the main thread once the background context lookup finishes
+        if future.exception():
+            print(f"Context lookup failed: {future.exception()}")
+            return
+        context = future.result()
+        self.update_weather_card(context["address"], context["temp"], context["condition"])
+
+    def watch_weather(self, *args):
+        # get_weather answers from its cache until the provider has a newer observation
+        fetch_context().add_done_callback(
+            lambda future: Clock.schedule_once(lambda dt: self.on_weather_checked(future))
+        )
+
+    def on_weather_checked(self, future):
+        if self.manager is None or self.manager.current != self.name:
+            return # Left the dashboard meanwhile; on_enter starts watching again
+
+        delay = WEATHER_DATA_INTERVAL # Lookup failed: don't retry every minute
+        if not future.exception():
+            context = future.result()
+            bucket, _ = get_context_names(context["condition"], current_hour())
+            cell = geohash(context["lat"], context["lon"], GEOHASH_PRECISION["places"])
+            if self.weather_bucket is not None and bucket != self.weather_bucket:
+                # Different weather individual -> new recommendations (update_ui also redraws the card)
+                print(f"Weather changed to {bucket}. Refreshing data...")
+                self.load_data()
+            elif self.location_cell is not None and cell != self.location_cell:
+                print("Location changed. Refreshing data...")
+                self.load_data()
+            else:
+                # Same bucket (e.g. only the temperature moved): just the label
+                self.update_weather_card(context["address"], context["temp"], context["condition"])
+            self.weather_bucket = bucket
+            self.location_cell = cell
+            delay = max(WEATHER_MIN_RECHECK, seconds_until_weather_update(context["lat"], context["lon"]))
+
+        if self.weather_event:
+            self.weather_event.cancel()
+        self.weather_event = Clock.schedule_once(self.watch_weather, delay)
+
+    def update_weather_card(self, address, temp, condition):
+        # Update labels
+        self.ids.weather_temp_label.text = f"{int(round(temp))}°C"
+        # Shorten address to just city if possible, roughly
+        city_name = address.split(",")[0] if "," in address else address
+        self.ids.weather_loc_label.text = city_name
+
+        # Determine icon and color based on condition
+        icon_name, icon_color = self.get_icon_map(condition)
+
+        # Update icon widget
+        self.ids.weather_icon.icon = icon_name
+        self.ids.weather_icon.text_color = icon_color
+
+    def get_icon_map(self, condition):
+        condition = condition.lower()
+        # Format: (Icon Name, Color Tuple RGBA)
+        if "clear" in condition:
+            return "weather-sunny", (1, 0.8, 0.3, 1) # Yellow/Orange
+        elif "few clouds" in condition:
+            return "weather-partly-cloudy", (1, 0.8, 0.3, 1)
+        elif "scattered clouds" in condition or "broken clouds" in condition:
+            return "weather-cloudy", (0.6, 0.6, 0.6, 1) # Grey
+        elif "shower rain" in condition or "rain" in condition:
+            return "weather-rainy", (0.3, 0.3, 0.5, 1) # Blue-grey
+        elif "thunderstorm" in condition:
+            return "weather-lightning", (0.2, 0.2, 0.4, 1) # Dark blue
+        elif "snow" in condition:
+            return "weather-snowy", (0.8, 0.9, 1, 1) # Light blue/white
+        elif "mist" in condition or "fog" in condition:
+            return "weather-fog", (0.7, 0.7, 0.7, 1) # Light grey
         else:
-            for key in smart_activity_keywords:
-                # We search specifically for what the ontology suggested
-                results = get_google_places(lat, lon, "", key)
-                activities_data.extend(results)
+            # Default backup
+            return "weather-cloudy", (0.6, 0.6, 0.6, 1)
+
+    def update_ui(self, address, temp, condition, restaurants, attractions, activities, meal_title, paging=None):
+        # Weather card always reflects the context these results were built from
+        self.update_weather_card(address, temp, condition)
+        self.weather_bucket, _ = get_context_names(condition, current_hour())
 
-        # Update UI on Main Thread
-        Clock.schedule_once(lambda dt: self.update_ui(
-            address, temp, condition, cuisines_data, attractions_data, activities_data, title
-        ))
+        self.show_sections(restaurants, attractions, activities, meal_title, paging)
 
-    def update_ui(self, address, temp, condition, restaurants, attractions, activities, meal_title):
+        # Get the next boundary ready while the user is looking at this one
+        self.schedule_prefetch()
+
+    def show_sections(self, restaurants, attractions, activities, meal_title, paging=None):
         # Update the Header Text dynamically
         self.ids.restaurant_header.text = meal_title
-        
-        # Clear existing lists to avoid duplicates
-        self.ids.restaurant_list.clear_widgets()
-        self.ids.attraction_list.clear_widgets()
-        self.ids.activity_list.clear_widgets()
-
-        def populate_list(data_list, ui_list_id):
-            # Limit to 10 to avoid UI overcrowding
-            for place in data_list[:10]:
-                card = TravelLocationCard(
-                    source=place['image'],
-                    text=place['name'],
-                    sub_text=f"{place['rating']} Stars"
-                )
-                ui_list_id.add_widget(card)
 
-        populate_list(restaurants, self.ids.restaurant_list)
-        populate_list(attractions, self.ids.attraction_list)
-        populate_list(activities, self.ids.activity_list)
+        paging = paging or {}
+        self.populate_section("restaurant_list", restaurants, paging.get("restaurant_list"))
+        self.populate_section("attraction_list", attractions, paging.get("attraction_list"))
+        self.populate_section("activity_list", activities, paging.get("activity_list"))
+
+    def populate_section(self, carousel_id, places, searches=None):
+        """
+        Shows the first MAX_CARDS_PER_SECTION places in a carousel; the rest
+        (and, via `searches`, further result pages) wait until it's scrolled.
+        """
+        if self.section_fingerprints is None:
+            self.section_fingerprints = {}
+            self.section_paging = {}
+
+        carousel = self.ids[carousel_id]
+        if carousel_id not in self.section_paging:
+            carousel.bind(scroll_x=lambda rv, scroll_x, cid=carousel_id: self.on_carousel_scroll(cid, scroll_x))
+
+        shown = places[:MAX_CARDS_PER_SECTION]
+        self.section_paging[carousel_id] = {
+            "shown": shown,
+            "pending": places[MAX_CARDS_PER_SECTION:],
+            "searches": searches or [],
+            "pages": None, # iter_google_places() generators, made on first use
+            "loading": False,
+        }
+
+        # The carousels are RecycleViews. Only the cards that changed are
+        # touched, and a section whose results are the same is left alone
+        # (e.g. attractions and activities when only the meal phase changed).
+        fingerprint = section_fingerprint(shown)
+        if self.section_fingerprints.get(carousel_id) == fingerprint:
+            return
+        self.section_fingerprints[carousel_id] = fingerprint
+
+        self._apply_card_diff(carousel, [self._card_data(place) for place in shown])
+
+    def on_carousel_scroll(self, carousel_id, scroll_x):
+        if scroll_x >= LOAD_MORE_AT:
+            self.load_more(carousel_id)
+
+    def load_more(self, carousel_id):
+        state = self.section_paging.get(carousel_id)
+        if not state or state["loading"]:
+            return
+
+        # Cards we already have come first
+        if state["pending"]:
+            batch = state["pending"][:CARDS_PER_SCROLL]
+            state["pending"] = state["pending"][CARDS_PER_SCROLL:]
+            self._append_cards(carousel_id, state, batch)
+            return
+
+        # Then the next page of every search behind this carousel
+        if state["pages"] is None:
+            state["pages"] = [iter_google_places(*search, start_page=1) for search in state["searches"]]
+        if not state["pages"]:
+            return # Every search is out of results
+        state["loading"] = True
+        threading.Thread(target=self._fetch_next_pages, args=(carousel_id, state), daemon=True).start()
+
+    def _fetch_next_pages(self, carousel_id, state):
+        try:
+            places, remaining = fetch_next_pages(state["pages"])
+        except Exception as e:
+            print(f"Loading more places failed: {e}")
+            places, remaining = [], []
+        Clock.schedule_once(lambda dt: self._on_next_pages(carousel_id, state, places, remaining))
+
+    def _on_next_pages(self, carousel_id, state, places, remaining):
+        state["loading"] = False
+        state["pages"] = remaining
+        if self.section_paging.get(carousel_id) is not state:
+            return # The section was refreshed meanwhile
+        # Later pages repeat venues already found by another keyword
+        origin = state["searches"][0][:2] if state["searches"] else None
+        known = {place_key(place) for place in state["shown"] + state["pending"]}
+        state["pending"].extend(merge_places([places], origin, exclude=known))
+        if state["pending"]:
+            self.load_more(carousel_id)
+
+    def _append_cards(self, carousel_id, state, places):
+        carousel = self.ids[carousel_id]
+        items = [self._card_data(place) for place in places]
+        carousel.data.extend(items)
+        state["shown"] = state["shown"] + places
+        self.section_fingerprints[carousel_id] = section_fingerprint(state["shown"])
+
+    def _card_data(self, place):
+        photo_ref = place.get('photo_reference')
+        return {
+            # Photos are loaded by the card itself once it's on screen
+            "source": None if photo_ref else place['image'], # "No image" placeholder
+            "photo_reference": photo_ref,
+            "place_id": place.get('place_id'),
+            "text": place['name'],
+            "sub_text": f"{place['rating']} Stars"
+        }
+
+    def _apply_card_diff(self, carousel, new_items):
+        """
+        Turns carousel.data into new_items with as few edits as possible, so
+        the RecycleView only rebinds the cards that differ.
+        """
+        old_items = list(carousel.data)
+        card_key = lambda item: item["place_id"] or item["text"]
+        matcher = SequenceMatcher(None, [card_key(i) for i in old_items], [card_key(i) for i in new_items], autojunk=False)
+
+        # Back to front, so the indices of the edits still to come stay valid
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag != "equal":
+                carousel.data[i1:i2] = new_items[j1:j2]
+                continue
+            for offset, (old, new) in enumerate(zip(old_items[i1:i2], new_items[j1:j2])):
+                if new != old:
+                    carousel.data[i1 + offset] = new
 
 class ProfileScreen(MDScreen):
     # Store the lists as class attributes so we can access them in 'save_and_exit'
@@ -547,9 +806,10 @@ class ProfileScreen(MDScreen):
 
         # 3. Load FRESH data from Database into our instance variables
         # We use 'list()' to ensure we create a mutable copy of the data
-        self.current_cuisine_list = list(run_query.get_user_cuisine_preferences(app.current_user_email))
-        self.current_activity_list = list(run_query.get_user_activity_preferences(app.current_user_email))
-        self.current_attraction_list = list(run_query.get_user_attraction_preferences(app.current_user_email))
+        prefs = db_module.get_user_preferences(app.current_user_email)
+        self.current_cuisine_list = list(prefs["cuisines"])
+        self.current_activity_list = list(prefs["activities"])
+        self.current_attraction_list = list(prefs["attractions"])
 
         # 4. Generate the Buttons
         self.populate_preferences()
@@ -614,22 +874,17 @@ class ProfileScreen(MDScreen):
     def save_and_exit(self):
         app = MDApp.get_running_app()
 
-        # 1. Convert the lists (which we modified in toggle_selection) back to strings
-        attraction_str = ", ".join(self.current_attraction_list)
-        activity_str = ", ".join(self.current_activity_list)
-        cuisine_str = ", ".join(self.current_cuisine_list)
-
-        # 2. Save to Database
-        run_query.update_preference(
-            attraction_str, 
-            activity_str, 
-            cuisine_str, 
-            app.current_user_email
+        # 1. Save the lists (which we modified in toggle_selection) to the Database
+        db_module.update_preferences(
+            app.current_user_email,
+            self.current_attraction_list,
+            self.current_activity_list,
+            self.current_cuisine_list
         )
         
         print("Preferences Saved Successfully!")
 
-        # 3. Go back to Dashboard
+        # 2. Go back to Dashboard
         self.manager.current = "dashboard"
 
 class NotificationScreen(MDScreen):
@@ -667,7 +922,23 @@ class TravelApp(MDApp):
         self.theme_cls.primary_palette = "Blue"
         return Builder.load_file("app_layout.kv")
 
+    def on_start(self):
+        if auth_module.has_saved_session():
+            self.root.get_screen("login").set_status("Signing you in...")
+
+        # Staged startup: everything else loads once the first frame is on screen
+        Window.bind(on_flip=self._on_first_frame)
+
+    def _on_first_frame(self, *args):
+        Window.unbind(on_flip=self._on_first_frame)
+        threading.Thread(target=self._start_up, daemon=True, name="warm-up").start()
+
+    def _start_up(self):
+        self.root.get_screen("login").restore_session()
+        warm_up()
+
     def logout(self):
+        auth_module.clear_session()
         self.current_user_email = None
         self.root.current = "login"
         self.is_loggin_in = False
@@ -1,106 +1,618 @@
-from owlready2 import *
+import hashlib
+import heapq
+import json
 import os
+import sys
+import threading
+from collections import OrderedDict
+import perf_module
+
+# Owlready2 is only imported when the ontology itself has to be parsed.
+# At runtime the app reads the precomputed ARTIFACT_PATH instead.
 
 # Define path
 ONTO_PATH = "assets/travel_ontology.owl"
+ARTIFACT_PATH = "assets/travel_ontology.recs.json"
+ARTIFACT_VERSION = 2 # Bump when the artifact layout changes, so old files get rebuilt
+
+# "artifact" keeps the whole compiled index in memory (fine for a few thousand places).
+# "quadstore" answers lookups from an Owlready2 SQLite quadstore, for city-scale catalogs.
+ONTOLOGY_BACKEND = os.getenv("ONTOLOGY_BACKEND", "artifact")
+QUADSTORE_PATH = "database/ontology_quadstore.sqlite3"
+
+# Context individuals defined in the ontology (see get_context_names)
+WEATHER_NAMES = ["Sunny", "Cloudy", "Rainy", "Snowy"]
+TIME_NAMES = ["Morning", "Afternoon", "Evening", "Night"]
+# First hour of each TimeOfDay individual; Night wraps past midnight
+TIME_OF_DAY_STARTS = [(5, "Morning"), (12, "Afternoon"), (17, "Evening"), (21, "Night")]
+
+# Ranking: how much each signal contributes to a place's score
+SCORE_WEIGHTS = {"category": 3.0, "weather": 1.0, "time": 1.0}
+DEFAULT_TOP_K = 3 # Keywords returned per recommendation (each one costs a Places search)
+
+# Process-wide ontology state: parsed once, re-parsed only when the .owl file changes
+_ONTOLOGY_LOCK = threading.Lock()
+_ONTOLOGY_STATE = {"ontology": None, "mtime": None, "index": None}
+
+# Process-wide recommendation index loaded from the artifact
+_INDEX_STATE = {"index": None, "mtime": None}
+
+class OntologyIndex():
+    """
+    In-memory lookup tables compiled from the Place individuals, so that
+    recommendations are a few dict lookups instead of a full ontology scan.
+    Plain data only, so it can be saved to and loaded from JSON.
+    """
+    def __init__(self, keywords, by_context, by_category, contexts=None):
+        self.keywords = keywords       # place name -> Google search keyword (or None)
+        self.by_context = by_context   # (weather name, time name) -> [place names]
+        self.by_category = by_category # lowercase category -> set of place names
+        self.contexts = contexts or {} # place name -> (weather names, time names); None = any
+
+    # Lookups used by the ranking code (QuadstoreIndex answers the same ones)
+    def places_for_context(self, weather_name, time_name):
+        return self.by_context.get((weather_name, time_name), [])
+
+    def places_for_category(self, category):
+        return self.by_category.get(category, set())
+
+    def keyword(self, name):
+        return self.keywords.get(name)
+
+    def context_of(self, name):
+        return self.contexts.get(name, (None, None))
+
+    def match_preferences(self, weather_name, time_name, strengths):
+        """
+        Context-compatible places in any of the preferred categories:
+        {place name: summed strength of the categories it's in}.
+        """
+        matches = {}
+        for category, strength in strengths.items():
+            for name in self.places_for_category(category):
+                weathers, times = self.context_of(name)
+                if (weathers is None or weather_name in weathers) and (times is None or time_name in times):
+                    matches[name] = matches.get(name, 0) + strength
+        return matches
+
+    def top_keywords_for_context(self, weather_name, time_name, k=DEFAULT_TOP_K):
+        """The k best keywords for a context regardless of preferences (the fallback)."""
+        return rank_places(self, self.places_for_context(weather_name, time_name), {}, k)
+
+    @classmethod
+    def from_ontology(cls, ontology):
+        keywords = {}
+        by_category = {}
+        contexts = {}
+        places = []
+        for place in ontology.Place.instances():
+            # An empty property list means the place is good for every weather/time
+            weathers = {w.name for w in place.is_good_for_weather} or None
+            times = {t.name for t in place.is_good_for_time} or None
+            places.append((place.name, weathers, times))
+            contexts[place.name] = (
+                sorted(weathers) if weathers else None,
+                sorted(times) if times else None,
+            )
+
+            keywords[place.name] = place.has_keyword[0] if place.has_keyword else None
+            for category in place.has_category:
+                by_category.setdefault(category.lower(), set()).add(place.name)
+
+        # Precompute the compatible places for every (weather, time) combination
+        by_context = {}
+        for weather in WEATHER_NAMES:
+            for time in TIME_NAMES:
+                by_context[(weather, time)] = [
+                    name for name, weathers, times in places
+                    if (weathers is None or weather in weathers)
+                    and (times is None or time in times)
+                ]
+
+        return cls(keywords, by_context, by_category, contexts)
+
+    def to_dict(self):
+        return {
+            "keywords": self.keywords,
+            "by_context": {f"{w}|{t}": names for (w, t), names in self.by_context.items()},
+            "by_category": {cat: sorted(names) for cat, names in self.by_category.items()},
+            "contexts": self.contexts,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["keywords"],
+            {tuple(key.split("|")): names for key, names in data["by_context"].items()},
+            {cat: set(names) for cat, names in data["by_category"].items()},
+            {name: tuple(ctx) for name, ctx in data.get("contexts", {}).items()},
+        )
+
+class QuadstoreIndex():
+    """
+    Same lookups as OntologyIndex, answered from an Owlready2 quadstore kept in
+    a SQLite file. The .owl file is imported once (again only when its hash
+    changes) and filters run as prepared SPARQL queries over the quadstore's
+    indexes, so startup and memory don't grow with the catalog: the
+    category/weather/time join happens in SQL and Python only sees the
+    matching places. The preference-less fallback ranking is a full scan, so
+    it's done once per context at import and kept in the sidecar file.
+    """
+    MAX_CACHED_CATEGORIES = 256
+    MAX_CACHED_PLACES = 4096
+    STORED_TOP_KEYWORDS = 10 # Fallback keywords kept per context
+    RANKING_VERSION = 2 # Bump when _rank_for_context changes, so stored rankings get recomputed
+
+    def __init__(self, path=QUADSTORE_PATH):
+        from owlready2 import World
+
+        # Sidecar file remembering which .owl the quadstore was built from
+        # (the .owl is only re-hashed when its mtime or size changed)
+        meta_path = path + ".json"
+        meta = None
+        if os.path.exists(meta_path) and os.path.exists(path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if not _is_same_source(meta, ONTO_PATH):
+                meta = None
+            elif meta.get("source_stamp") != _source_stamp(ONTO_PATH):
+                meta["source_stamp"] = _source_stamp(ONTO_PATH) # Touched, same content
+                _write_json(meta_path, meta)
+        if meta is None and os.path.exists(path):
+            os.remove(path)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.world = World(filename=path, exclusive=False)
+        if meta is None:
+            with perf_module.span("ontology.quadstore_import"):
+                onto = self.world.get_ontology(ONTO_PATH).load()
+                self.world.save()
+            meta = {"source_sha256": _file_sha256(ONTO_PATH), "source_stamp": _source_stamp(ONTO_PATH),
+                    "base_iri": onto.base_iri}
+        self.base_iri = meta["base_iri"]
+
+        self._lock = threading.Lock()
+        self._category_cache = OrderedDict() # lowercase category -> set of place names
+        self._place_cache = OrderedDict()    # place name -> (keyword, weathers, times)
 
-def load_ontology():
-    """Loads the ontology file."""
+        prefix = f"PREFIX t: <{self.base_iri}>\n"
+        self._prefix = prefix
+        # A place fits a context if it lists that weather/time, or lists none at all
+        fits_context = """
+              { ?p t:is_good_for_weather ??1 } UNION { ?p a t:Place . FILTER NOT EXISTS { ?p t:is_good_for_weather ?w } }
+              { ?p t:is_good_for_time ??2 } UNION { ?p a t:Place . FILTER NOT EXISTS { ?p t:is_good_for_time ?t } }"""
+        self._context_query = self.world.prepare_sparql(
+            prefix + "SELECT ?p WHERE { ?p a t:Place ." + fits_context + " }")
+        # Same test written as joins on the category's places (Owlready2 would
+        # evaluate the UNIONs above over the whole catalog first)
+        self._preference_query = self.world.prepare_sparql(prefix + """
+            SELECT DISTINCT ?p WHERE {
+              ?p t:has_category ??3 .
+              OPTIONAL { ?p t:is_good_for_weather ?w }
+              OPTIONAL { ?p t:is_good_for_time ?t }
+              FILTER((!BOUND(?w) || ?w = ??1) && (!BOUND(?t) || ?t = ??2))
+            }""")
+        self._category_query = self.world.prepare_sparql(prefix + "SELECT ?p WHERE { ?p t:has_category ??1 }")
+        # Compatible places best-first, scored with the _context_fit() formula
+        # (keep the two in step). Decimal literals: the quadstore is SQLite,
+        # where 3 / 4 is 0.
+        fit = "IF(?n{0} = 0, 0.5, 0.5 + 0.5 * ({1}.0 - ?n{0} + 1.0) / {1}.0)"
+        self._ranking_query = self.world.prepare_sparql(prefix + f"""
+            SELECT ?p ?score WHERE {{
+              {{ SELECT ?p (COUNT(DISTINCT ?pw) AS ?nw) (COUNT(DISTINCT ?pt) AS ?nt) WHERE {{
+                  ?p a t:Place .{fits_context}
+                  OPTIONAL {{ ?p t:is_good_for_weather ?pw }}
+                  OPTIONAL {{ ?p t:is_good_for_time ?pt }}
+                }} GROUP BY ?p }}
+              BIND({SCORE_WEIGHTS["weather"]} * {fit.format("w", len(WEATHER_NAMES))}
+                 + {SCORE_WEIGHTS["time"]} * {fit.format("t", len(TIME_NAMES))} AS ?score)
+            }} ORDER BY DESC(?score)""")
+
+        if meta.get("ranking_version") != self.RANKING_VERSION:
+            meta["ranking_version"] = self.RANKING_VERSION
+            meta["top_keywords"] = {
+                f"{weather}|{time}": self._rank_for_context(weather, time, self.STORED_TOP_KEYWORDS)
+                for weather in WEATHER_NAMES for time in TIME_NAMES
+            }
+            _write_json(meta_path, meta)
+        self._top_keywords = meta["top_keywords"]
+
+        # Categories are matched case-insensitively, but the quadstore index needs the exact literal
+        self._categories = {}
+        for (category,) in self.world.sparql(prefix + "SELECT DISTINCT ?c WHERE { ?p t:has_category ?c }"):
+            self._categories[str(category).lower()] = category
+
+    def places_for_context(self, weather_name, time_name):
+        # Every compatible place: a scan, so recommend_all doesn't use it here
+        weather, time = self._context_individuals(weather_name, time_name)
+        if weather is None or time is None:
+            return []
+        with self._lock:
+            return sorted({row[0].name for row in self._context_query.execute([weather, time])})
+
+    def match_preferences(self, weather_name, time_name, strengths):
+        """Same as OntologyIndex.match_preferences, one indexed query per category."""
+        weather, time = self._context_individuals(weather_name, time_name)
+        matches = {}
+        if weather is None or time is None:
+            return matches
+        with self._lock:
+            for category, strength in strengths.items():
+                literal = self._categories.get(category)
+                if literal is None:
+                    continue
+                for row in self._preference_query.execute([weather, time, literal]):
+                    matches[row[0].name] = matches.get(row[0].name, 0) + strength
+        return matches
+
+    def top_keywords_for_context(self, weather_name, time_name, k=DEFAULT_TOP_K):
+        """
+        Same as OntologyIndex.top_keywords_for_context, from the ranking
+        stored at import (or a fresh one if more than that is asked for).
+        """
+        stored = self._top_keywords.get(f"{weather_name}|{time_name}")
+        if stored is not None and k <= self.STORED_TOP_KEYWORDS:
+            return stored[:k]
+        return self._rank_for_context(weather_name, time_name, k)
+
+    def _rank_for_context(self, weather_name, time_name, k):
+        # Same result as rank_places() with no preferences. Keywords are looked
+        # up per place, since a place only counts under its first keyword.
+        weather, time = self._context_individuals(weather_name, time_name)
+        if weather is None or time is None:
+            return []
+        best = {} # keyword -> best score (rows come best-first)
+        cutoff = None
+        with self._lock:
+            for row in self._ranking_query.execute([weather, time]):
+                place, score = row
+                if cutoff is not None and score < cutoff:
+                    break # Every keyword still unseen ranks below the top k
+                keyword = self._load_place(place.name)[0]
+                if keyword and keyword not in best:
+                    best[keyword] = score
+                    if len(best) == k:
+                        cutoff = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        return [keyword for keyword, _ in ranked[:k]]
+
+    def _context_individuals(self, weather_name, time_name):
+        return self.world[self.base_iri + weather_name], self.world[self.base_iri + time_name]
+
+    def places_for_category(self, category):
+        with self._lock:
+            if category in self._category_cache:
+                self._category_cache.move_to_end(category)
+                return self._category_cache[category]
+
+            literal = self._categories.get(category)
+            names = {row[0].name for row in self._category_query.execute([literal])} if literal else set()
+            self._category_cache[category] = names
+            if len(self._category_cache) > self.MAX_CACHED_CATEGORIES:
+                self._category_cache.popitem(last=False)
+            return names
+
+    def keyword(self, name):
+        return self._place(name)[0]
+
+    def context_of(self, name):
+        return self._place(name)[1:]
+
+    def _place(self, name):
+        with self._lock:
+            return self._load_place(name)
+
+    def _load_place(self, name):
+        # Caller holds the lock
+        if name in self._place_cache:
+            self._place_cache.move_to_end(name)
+            return self._place_cache[name]
+
+        place = self.world[self.base_iri + name]
+        if place is None:
+            info = (None, None, None)
+        else:
+            info = (
+                place.has_keyword[0] if place.has_keyword else None,
+                sorted(w.name for w in place.is_good_for_weather) or None,
+                sorted(t.name for t in place.is_good_for_time) or None,
+            )
+        self._place_cache[name] = info
+        if len(self._place_cache) > self.MAX_CACHED_PLACES:
+            self._place_cache.popitem(last=False)
+        return info
+
+    def close(self):
+        self.world.close()
+
+def load_ontology(check_for_changes=True):
+    """
+    Returns the shared ontology, loading it on first use.
+    If check_for_changes is set, the file is re-parsed when its mtime changes.
+    """
     if not os.path.exists(ONTO_PATH):
         print("Ontology file not found! Please run create_ontology.py first.")
         return None
-    
-    onto = get_ontology(ONTO_PATH).load()
-    return onto
 
-def get_context_individuals(ontology, condition, hour):
-    """Maps real-world data to Ontology Individuals."""
-    
+    with _ONTOLOGY_LOCK:
+        mtime = os.path.getmtime(ONTO_PATH)
+        onto = _ONTOLOGY_STATE["ontology"]
+
+        if onto is not None and not (check_for_changes and mtime != _ONTOLOGY_STATE["mtime"]):
+            return onto
+
+        with perf_module.span("ontology.load") as load_span:
+            if onto is None:
+                from owlready2 import get_ontology
+                onto = get_ontology(ONTO_PATH).load()
+            else:
+                load_span.attrs["reload"] = True # The file changed
+                onto = onto.load(reload=True)
+
+            _ONTOLOGY_STATE["ontology"] = onto
+            _ONTOLOGY_STATE["mtime"] = mtime
+            _ONTOLOGY_STATE["index"] = OntologyIndex.from_ontology(onto)
+        return onto
+
+def get_ontology_index(ontology):
+    """Returns the compiled index for the shared ontology (or compiles one for any other)."""
+    with _ONTOLOGY_LOCK:
+        if ontology is _ONTOLOGY_STATE["ontology"] and _ONTOLOGY_STATE["index"]:
+            return _ONTOLOGY_STATE["index"]
+    return OntologyIndex.from_ontology(ontology)
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _is_same_source(meta, path):
+    """
+    True if meta (an artifact or the quadstore sidecar) was built from the
+    file at path. The file is only hashed when its mtime or size changed.
+    """
+    if meta.get("source_stamp") == _source_stamp(path):
+        return True
+    return meta.get("source_sha256") == _file_sha256(path)
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"), sort_keys=True)
+
+@perf_module.timed("ontology.build_artifact")
+def build_recommendation_artifact(use_reasoner=False):
+    """
+    Materializes the compatible places for all 16 (weather, time) contexts
+    and writes them to ARTIFACT_PATH, tagged with the .owl file's hash.
+    With use_reasoner, Owlready2's reasoner (HermiT, needs Java) runs first
+    so that inferred weather/time facts are included.
+    Returns the compiled OntologyIndex.
+    """
+    from owlready2 import World, sync_reasoner
+
+    # A private world, so reasoning never leaks into the app's shared ontology
+    world = World()
+    onto = world.get_ontology(ONTO_PATH).load()
+
+    reasoned = False
+    if use_reasoner:
+        try:
+            with perf_module.span("ontology.reasoner"), onto:
+                sync_reasoner(world, infer_property_values=True)
+            reasoned = True
+        except Exception as e:
+            print(f"Reasoner failed, using asserted facts only: {e}")
+
+    index = OntologyIndex.from_ontology(onto)
+    artifact = {"version": ARTIFACT_VERSION, "source_sha256": _file_sha256(ONTO_PATH),
+                "source_stamp": _source_stamp(ONTO_PATH), "reasoned": reasoned}
+    artifact.update(index.to_dict())
+
+    try:
+        with open(ARTIFACT_PATH, "w", encoding="utf-8") as f:
+            json.dump(artifact, f, separators=(",", ":"), sort_keys=True)
+        print(f"Recommendation artifact written to {ARTIFACT_PATH}")
+    except OSError as e:
+        # e.g. read-only assets on Android; the in-memory index still works
+        print(f"Could not write recommendation artifact: {e}")
+
+    world.close()
+    return index
+
+def load_recommendation_index():
+    """
+    Returns the shared recommendation index.
+    Reads ARTIFACT_PATH when it matches the current .owl file (no Owlready2
+    needed); otherwise rebuilds the artifact from the ontology.
+    With ONTOLOGY_BACKEND = "quadstore", returns a QuadstoreIndex instead.
+    """
+    if not os.path.exists(ONTO_PATH) and not os.path.exists(ARTIFACT_PATH):
+        print("Ontology file not found! Please run create_ontology.py first.")
+        return None
+
+    with _ONTOLOGY_LOCK:
+        # Only re-hash when the ontology file was touched
+        mtime = os.path.getmtime(ONTO_PATH) if os.path.exists(ONTO_PATH) else None
+        if _INDEX_STATE["index"] is not None and mtime == _INDEX_STATE["mtime"]:
+            return _INDEX_STATE["index"]
+
+        with perf_module.span("ontology.load_index", backend=ONTOLOGY_BACKEND):
+            if ONTOLOGY_BACKEND == "quadstore" and mtime is not None:
+                if _INDEX_STATE["index"] is not None and hasattr(_INDEX_STATE["index"], "close"):
+                    _INDEX_STATE["index"].close()
+                _INDEX_STATE["index"] = QuadstoreIndex()
+                _INDEX_STATE["mtime"] = mtime
+                return _INDEX_STATE["index"]
+
+            index = None
+            if os.path.exists(ARTIFACT_PATH):
+                with open(ARTIFACT_PATH, encoding="utf-8") as f:
+                    artifact = json.load(f)
+                # Without the .owl file (e.g. a trimmed APK) the shipped artifact is trusted
+                is_current = mtime is None or _is_same_source(artifact, ONTO_PATH)
+                if is_current and artifact.get("version") == ARTIFACT_VERSION:
+                    index = OntologyIndex.from_dict(artifact)
+
+            if index is None:
+                # Missing or stale (shows up as an ontology.build_artifact span)
+                index = build_recommendation_artifact()
+
+        _INDEX_STATE["index"] = index
+        _INDEX_STATE["mtime"] = mtime
+        return index
+
+def get_context_names(condition, hour):
+    """Maps real-world data to the names of the Weather and TimeOfDay individuals."""
+
     # Map Weather
     condition = condition.lower()
     if "rain" in condition or "drizzle" in condition or "thunder" in condition:
-        weather_ind = ontology.search_one(iri="*Rainy")
+        weather_name = "Rainy"
     elif "snow" in condition:
-        weather_ind = ontology.search_one(iri="*Snowy")
+        weather_name = "Snowy"
     elif "cloud" in condition:
-        weather_ind = ontology.search_one(iri="*Cloudy")
+        weather_name = "Cloudy"
     else:
-        weather_ind = ontology.search_one(iri="*Sunny")
+        weather_name = "Sunny"
 
     # Map Time
-    if 5 <= hour < 12:
-        time_ind = ontology.search_one(iri="*Morning")
-    elif 12 <= hour < 17:
-        time_ind = ontology.search_one(iri="*Afternoon")
-    elif 17 <= hour < 21:
-        time_ind = ontology.search_one(iri="*Evening")
-    else:
-        time_ind = ontology.search_one(iri="*Night")
-        
+    time_name = TIME_OF_DAY_STARTS[-1][1]
+    for start_hour, name in TIME_OF_DAY_STARTS:
+        if hour >= start_hour:
+            time_name = name
+
+    return weather_name, time_name
+
+def get_context_individuals(ontology, condition, hour):
+    """Maps real-world data to Ontology Individuals."""
+    weather_name, time_name = get_context_names(condition, hour)
+
+    weather_ind = ontology.search_one(iri=f"*{weather_name}")
+    time_ind = ontology.search_one(iri=f"*{time_name}")
+
     return weather_ind, time_ind
 
-def get_smart_recommendation(ontology, weather_desc, current_hour, user_preferences):
+def _preference_strengths(user_preferences):
+    """
+    Returns {lowercase pref: strength}.
+    A dict is taken as explicit weights; for a list, earlier entries count
+    more (1.0 for the first, down to 0.5 for the last).
+    """
+    if isinstance(user_preferences, dict):
+        return {pref.lower(): weight for pref, weight in user_preferences.items()}
+
+    count = len(user_preferences)
+    return {
+        pref.lower(): 1.0 - 0.5 * i / count
+        for i, pref in reversed(list(enumerate(user_preferences)))
+    }
+
+def _context_fit(listed, total):
+    """
+    How well a compatible place fits one context dimension (0.5 - 1.0).
+    Places good for anything are neutral; the fewer conditions a place lists,
+    the more specifically it was meant for this one.
+    """
+    if not listed:
+        return 0.5
+    return 0.5 + 0.5 * (total - len(listed) + 1) / total
+
+def rank_places(index, place_names, strengths, k=DEFAULT_TOP_K, category_scores=None):
+    """
+    Scores the given (context-compatible) places and returns the top-k
+    keywords. Equal scores are broken by keyword, so results are stable.
+    category_scores ({place name: summed strength}, see match_preferences)
+    saves looking every place up in every preferred category.
+    """
+    best = {} # keyword -> best score of any place using it
+    for name in place_names:
+        keyword = index.keyword(name)
+        if not keyword:
+            continue
+
+        weathers, times = index.context_of(name)
+        score = SCORE_WEIGHTS["weather"] * _context_fit(weathers, len(WEATHER_NAMES))
+        score += SCORE_WEIGHTS["time"] * _context_fit(times, len(TIME_NAMES))
+        if category_scores is not None:
+            score += SCORE_WEIGHTS["category"] * category_scores.get(name, 0)
+        else:
+            score += SCORE_WEIGHTS["category"] * sum(
+                strength for pref, strength in strengths.items()
+                if name in index.places_for_category(pref)
+            )
+
+        if score > best.get(keyword, float("-inf")):
+            best[keyword] = score
+
+    top = heapq.nsmallest(k, best.items(), key=lambda item: (-item[1], item[0]))
+    return [keyword for keyword, score in top]
+
+def _resolve_index(ontology):
+    if ontology is None:
+        return load_recommendation_index()
+    if isinstance(ontology, (OntologyIndex, QuadstoreIndex)):
+        return ontology
+    return get_ontology_index(ontology)
+
+@perf_module.timed("ontology.reason")
+def recommend_all(context, preferences_by_category, ontology=None, k=DEFAULT_TOP_K):
+    """
+    Recommends keywords for several preference categories at once.
+    context is {"condition": weather description, "hour": 0-23}.
+    preferences_by_category is e.g. {"cuisines": [...], "attractions": [...]}.
+    Each category only looks at the compatible places in its preferred
+    categories (a join the quadstore runs in SQL), never at the whole catalog.
+    Returns {category: [keywords]}.
+    """
+    index = _resolve_index(ontology)
+    if not index:
+        return {category: ["restaurant", "park", "museum"][:k] for category in preferences_by_category} # Fallback
+
+    weather_name, time_name = get_context_names(context["condition"], context["hour"])
+    reason_span = perf_module.current()
+    if reason_span is not None:
+        reason_span.attrs.update(weather=weather_name, time=time_name)
+
+    results = {}
+    general = None
+    for category, prefs in preferences_by_category.items():
+        strengths = _preference_strengths(prefs)
+
+        # 1. REASONING + FILTERING: places compatible with the context (precomputed)
+        # in the categories the preferences point at, with their category score
+        matches = index.match_preferences(weather_name, time_name, strengths)
+        results[category] = rank_places(index, matches, strengths, k, category_scores=matches)
+
+        # 2. FALLBACK: If logic is too strict and returns nothing, give generic contextual items
+        if not results[category]:
+            perf_module.count("ontology.fallback")
+            if general is None:
+                general = index.top_keywords_for_context(weather_name, time_name, k)
+            results[category] = general
+
+    return results
+
+def get_smart_recommendation(ontology, weather_desc, current_hour, user_preferences, k=DEFAULT_TOP_K):
     """
     1. Finds places compatible with Weather & Time.
     2. Filters them by User Preferences.
-    3. Returns list of keywords for Google API.
+    3. Returns the k best-scoring keywords for Google API (same input -> same output).
+    'ontology' can be an OntologyIndex (see load_recommendation_index) or a loaded ontology.
+    user_preferences is a list (earlier = stronger) or a {pref: weight} dict.
+    For several categories at once, use recommend_all.
     """
     if not ontology:
-        return ["restaurant", "park", "museum"] # Fallback
-
-    weather_ind, time_ind = get_context_individuals(ontology, weather_desc, current_hour)
-    
-    print(f"DEBUG: Context Detected -> {weather_ind.name} + {time_ind.name}")
-    print(f"DEBUG: User Prefs -> {user_preferences}")
-
-    valid_places = []
-
-    # 1. REASONING: Find all places compatible with context
-    for place in ontology.Place.instances():
-        
-        # Check Weather Compatibility
-        # (If is_good_for_weather is defined, we check it. If empty, assume good for all)
-        is_weather_ok = False
-        if not place.is_good_for_weather: 
-            is_weather_ok = True
-        elif weather_ind in place.is_good_for_weather:
-            is_weather_ok = True
-            
-        # Check Time Compatibility
-        is_time_ok = False
-        if not place.is_good_for_time:
-            is_time_ok = True
-        elif time_ind in place.is_good_for_time:
-            is_time_ok = True
-
-        if is_weather_ok and is_time_ok:
-            valid_places.append(place)
-
-    # 2. FILTERING: Match with User Preferences
-    # user_preferences is a list like ["Hiking", "Italian", "Museum"]
-    
-    final_recommendations = []
-    
-    # Normalize prefs to lowercase for comparison
-    user_prefs_lower = [p.lower() for p in user_preferences]
-
-    for place in valid_places:
-        # Check if place category matches ANY user preference
-        # We look at the 'has_category' data property
-        place_cats = [c.lower() for c in place.has_category]
-        
-        # Intersection check
-        if any(pref in place_cats for pref in user_prefs_lower):
-            # Get the search keyword for Google API
-            if place.has_keyword:
-                final_recommendations.append(place.has_keyword[0])
-    
-    # 3. FALLBACK: If logic is too strict and returns nothing, give generic contextual items
-    if not final_recommendations:
-        print("DEBUG: No direct preference match found. Returning general contextual suggestions.")
-        for place in valid_places:
-            if place.has_keyword:
-                final_recommendations.append(place.has_keyword[0])
-
-    # Return unique keywords, limited to top 3 to avoid API spam
-    return list(set(final_recommendations))[:3]
\ No newline at end of file
+        return ["restaurant", "park", "museum"][:k] # Fallback
+
+    context = {"condition": weather_desc, "hour": current_hour}
+    return recommend_all(context, {"preferences": user_preferences}, ontology, k)["preferences"]
+
+if __name__ == "__main__":
+    # python ontology_module.py [--reason]
+    build_recommendation_artifact(use_reasoner="--reason" in sys.argv)
@@ -0,0 +1,287 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Timings and counters for the app's hot paths (ontology, API calls, DB,
+# images, UI). Spans opened inside another span on the same thread become
+# its children, so one dashboard refresh is recorded as one tree:
+#
+#     with perf_module.span("refresh"):
+#         with perf_module.span("api.places", page=0):
+#             ...
+#
+# Work handed to another thread joins the tree through wrap() / activate().
+# Each finished top-level span (a "trace") is kept in memory and, if
+# PERF_LOG is set, appended to that file as one JSON line.
+# PERF_TRACE=0 turns all of it into no-ops.
+
+ENABLED = os.getenv("PERF_TRACE", "1") != "0"
+EXPORT_PATH = os.getenv("PERF_LOG") # JSON lines file, one trace per line
+
+HISTOGRAM_WINDOW = 500 # Most recent durations kept per span name
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000] # Upper bucket edges
+MAX_TRACES = 20
+
+_local = threading.local() # .stack: spans open on this thread, innermost last
+_lock = threading.Lock()
+_histograms = {} # span name -> RollingHistogram
+_counters = {}   # counter name -> int
+_traces = deque(maxlen=MAX_TRACES)
+_listeners = []
+
+class Span():
+    """One timed piece of work; children are the spans opened while it was active."""
+    def __init__(self, name, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.children = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = None # Set by finish()
+        if parent is not None:
+            with _lock:
+                parent.children.append(self)
+
+    def root(self):
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    def to_dict(self):
+        with _lock:
+            children = list(self.children)
+            attrs = {key: dict(value) if isinstance(value, dict) else value for key, value in self.attrs.items()}
+        return {
+            "name": self.name,
+            "started_at": round(self.started_at, 3),
+            "ms": None if self.duration_ms is None else round(self.duration_ms, 3),
+            **({"attrs": attrs} if attrs else {}),
+            **({"children": [child.to_dict() for child in children]} if children else {}),
+        }
+
+class RollingHistogram():
+    """Durations (ms) of the last `window` samples of one span name."""
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self._samples = deque(maxlen=window)
+        self.total_count = 0
+
+    def add(self, ms):
+        self._samples.append(ms)
+        self.total_count += 1
+
+    def percentile(self, p):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def buckets(self):
+        """Counts per HISTOGRAM_BOUNDS_MS bucket: {"<=1": n, ..., ">5000": n}."""
+        counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for ms in self._samples:
+            counts[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, ms)] += 1
+        labels = [f"<={bound}" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}"]
+        return dict(zip(labels, counts))
+
+    def summary(self):
+        return {
+            "count": self.total_count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": max(self._samples) if self._samples else None,
+        }
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def current():
+    """The innermost span open on this thread, or None."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+def start_span(name, parent=None, **attrs):
+    """
+    Starts a span without making it current (see activate()); finish() ends it.
+    With no parent it's a new trace, e.g. a refresh whose parts run on
+    several threads.
+    """
+    if not ENABLED:
+        return Span(name, **attrs) # Detached; finish() won't record it
+    return Span(name, parent, **attrs)
+
+def finish(span, **attrs):
+    """Ends a span, records its duration and, for a trace, keeps/exports it."""
+    if span.duration_ms is not None:
+        return
+    span.duration_ms = (time.perf_counter() - span._start) * 1000
+    span.attrs.update(attrs)
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(span.name)
+        if histogram is None:
+            histogram = _histograms[span.name] = RollingHistogram()
+        histogram.add(span.duration_ms)
+        if span.parent is None:
+            _traces.append(span)
+        listeners = list(_listeners)
+    if span.parent is None:
+        _export(span)
+        for listener in listeners:
+            listener(span)
+
+@contextmanager
+def activate(span):
+    """Makes an existing span current on this thread, so new spans nest under it."""
+    stack = _stack()
+    stack.append(span)
+    try:
+        yield span
+    finally:
+        stack.remove(span)
+
+@contextmanager
+def _span(name, parent, attrs):
+    span = Span(name, parent if parent is not None else current(), **attrs)
+    stack = _stack()
+    stack.append(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        stack.remove(span)
+        finish(span)
+
+def span(name, parent=None, **attrs):
+    """
+    Times the block as a child of the current span (or of `parent`).
+    The span is yielded, so attributes found along the way can be added:
+        with span("api.weather") as s: s.attrs["status"] = 304
+    """
+    if not ENABLED:
+        return nullcontext(Span(name))
+    return _span(name, parent, attrs)
+
+def timed(name):
+    """Decorator: runs every call of the function in a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def wrap(func):
+    """Binds func to the current span, for running on a worker thread."""
+    parent = current()
+    if parent is None or not ENABLED:
+        return func
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with activate(parent):
+            return func(*args, **kwargs)
+    return wrapper
+
+def count(name, n=1):
+    """Adds to a counter (e.g. "cache.places.hit"); also tallied on the current trace."""
+    if not ENABLED:
+        return
+    parent = current()
+    trace = parent.root() if parent is not None else None
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+        if trace is not None:
+            counts = trace.attrs.setdefault("counts", {})
+            counts[name] = counts.get(name, 0) + n
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+def stats():
+    """{span name: {"count", "p50", "p95", "max"}} over each name's rolling window (ms)."""
+    with _lock:
+        return {name: histogram.summary() for name, histogram in _histograms.items()}
+
+def histogram(name):
+    with _lock:
+        histogram = _histograms.get(name)
+        return histogram.buckets() if histogram else None
+
+def last_trace(name=None):
+    """The most recently finished trace (with that name, if given), or None."""
+    with _lock:
+        for trace in reversed(_traces):
+            if name is None or trace.name == name:
+                return trace
+    return None
+
+def add_listener(listener):
+    """listener(trace) is called, on the thread that finished it, for every finished trace."""
+    with _lock:
+        _listeners.append(listener)
+
+def remove_listener(listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _traces.clear()
+
+def set_export_path(path):
+    global EXPORT_PATH
+    EXPORT_PATH = path
+
+def _export(trace):
+    if not EXPORT_PATH:
+        return
+    line = json.dumps(trace.to_dict(), separators=(",", ":"), default=str)
+    try:
+        with _lock, open(EXPORT_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError as e:
+        print(f"Could not write perf log: {e}")
+
+def format_trace(trace, max_depth=2):
+    """
+    A trace as indented "name  ms" lines (for the debug overlay), followed
+    by its counters. Siblings with the same name are folded into one line,
+    e.g. "api.places x9" with their summed time.
+    """
+    lines = []
+
+    def add(spans, depth):
+        groups = {}
+        for child in spans:
+            groups.setdefault(child.name, []).append(child)
+        for name, group in groups.items():
+            total = sum(child.duration_ms or 0 for child in group)
+            label = name if len(group) == 1 else f"{name} x{len(group)}"
+            lines.append(f"{'  ' * depth}{label}  {total:.0f} ms")
+            if depth < max_depth:
+                with _lock:
+                    grandchildren = [grandchild for child in group for grandchild in child.children]
+                add(grandchildren, depth + 1)
+
+    add([trace], 0)
+    with _lock:
+        counts = dict(trace.attrs.get("counts", {}))
+    lines.extend(f"{name}: {n}" for name, n in sorted(counts.items()))
+    return "\n".join(lines)
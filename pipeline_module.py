@@ -0,0 +1,317 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import db_module
+import perf_module
+from cache_module import geohash, GEOHASH_PRECISION, CACHE_TTL
+from context_module import fetch_context, get_google_places_batch, stream_google_places_batch, is_places_search_cached, build_photo_url
+from ontology_module import recommend_all, get_context_names, TIME_OF_DAY_STARTS
+
+# The dashboard refresh without any UI code, so it can also run headless
+# (see benchmarks/run_benchmarks.py).
+
+# Meal phases of the dashboard's restaurant section:
+# (first hour, phase name, display title, Places keyword). LateNight wraps past midnight.
+MEAL_PHASES = [
+    (5, "Breakfast", "Morning Fuel", "breakfast"),
+    (11, "Lunch", "Lunch Spots", "lunch"),
+    (15, "Snacks", "Afternoon Snacks", "cafe"),
+    (18, "Dinner", "Dinner Time", "dinner"),
+    (22, "LateNight", "Late Night Eats", "late night food"),
+]
+
+# Merged results are ranked by rating minus distance: one star is worth this many km
+DISTANCE_KM_PER_STAR = 10
+# Show a place found for several sections only in the first one (cuisines,
+# attractions, activities). Off by default: when the ontology falls back to
+# the same keywords for two sections, the second one would come out empty.
+DEDUPE_ACROSS_SECTIONS = False
+
+# Place lists of a dashboard (see _dashboard_data)
+DASHBOARD_SECTIONS = ("restaurants", "attractions", "activities")
+
+# Most API calls (Places searches + photo downloads) one prefetch may spend
+PREFETCH_API_BUDGET = int(os.getenv("PREFETCH_API_BUDGET", "12"))
+
+# Recent refreshes: (email, inputs key) -> (finished at, places by section, searches by section).
+# Reused while nothing the recommendations depend on has changed; a prefetch
+# for the next boundary lands here too, ready for when it arrives.
+MAX_REMEMBERED_RESULTS = 8
+_last_results = OrderedDict()
+_last_results_lock = threading.Lock()
+
+def get_meal_context(hour):
+    """Returns (Phase Name, Display Title, API Keyword) for an hour (0-23)."""
+    current = MEAL_PHASES[-1] # Before the first phase starts it's still LateNight
+    for phase in MEAL_PHASES:
+        if hour >= phase[0]:
+            current = phase
+    return current[1:]
+
+def next_boundary(now=None):
+    """
+    Returns the datetime of the next meal phase or TimeOfDay change after
+    `now`; the recommendations can't change between two boundaries
+    unless the weather or the location does.
+    """
+    now = now or datetime.now()
+    hours = sorted({phase[0] for phase in MEAL_PHASES} | {start for start, _ in TIME_OF_DAY_STARTS})
+    today = now.replace(minute=0, second=0, microsecond=0)
+    for hour in hours:
+        boundary = today.replace(hour=hour)
+        if boundary > now:
+            return boundary
+    return today.replace(hour=hours[0]) + timedelta(days=1)
+
+def recommendation_inputs(context, hour, meal_keyword, prefs):
+    """
+    Everything the ontology and the Places searches depend on.
+    The raw temperature and weather wording are left out on purpose: only
+    the weather bucket (Sunny/Cloudy/Rainy/Snowy) reaches the ontology.
+    """
+    weather_name, time_name = get_context_names(context["condition"], hour)
+    cell = geohash(context["lat"], context["lon"], GEOHASH_PRECISION["places"])
+    pref_key = tuple((category, tuple(values)) for category, values in sorted(prefs.items()))
+    return (weather_name, time_name, cell, meal_keyword, pref_key)
+
+def clear_last_results():
+    with _last_results_lock:
+        _last_results.clear()
+
+def _recall_places(email, inputs):
+    with _last_results_lock:
+        entry = _last_results.get((email, inputs))
+        if entry is None:
+            return None
+        finished_at, places, searches = entry
+        if time.time() - finished_at >= CACHE_TTL["places"]:
+            del _last_results[(email, inputs)]
+            return None
+        _last_results.move_to_end((email, inputs))
+        return places, searches
+
+def _remember_places(email, inputs, places, searches):
+    # A search that failed comes back empty; don't hold on to that
+    if not all(places.values()):
+        return
+    with _last_results_lock:
+        _last_results[(email, inputs)] = (time.time(), places, searches)
+        _last_results.move_to_end((email, inputs))
+        while len(_last_results) > MAX_REMEMBERED_RESULTS:
+            _last_results.popitem(last=False)
+
+def place_key(place):
+    return place.get("place_id") or place["name"]
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance (haversine)."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+def merge_places(pages, origin=None, exclude=()):
+    """
+    Combines the result pages of a section's searches: every place once
+    (by place_id), best first by rating and distance from origin (lat, lon).
+    Places whose key is in `exclude` are left out.
+    """
+    seen = set(exclude)
+    merged = []
+    for page in pages:
+        for place in page or []:
+            key = place_key(place)
+            if key not in seen:
+                seen.add(key)
+                merged.append(place)
+    # Stable sort: equally good places keep the order of the searches
+    merged.sort(key=lambda place: -_place_score(place, origin))
+    return merged
+
+def merge_sections(pages_by_section, origin=None):
+    """merge_places() for every section, also across sections if DEDUPE_ACROSS_SECTIONS."""
+    merged = {}
+    taken = set()
+    for section, pages in pages_by_section.items():
+        merged[section] = merge_places(pages, origin, exclude=taken)
+        if DEDUPE_ACROSS_SECTIONS:
+            taken.update(place_key(place) for place in merged[section])
+    return merged
+
+def _place_score(place, origin):
+    try:
+        score = float(place["rating"])
+    except (TypeError, ValueError):
+        score = 0.0 # Unrated
+    if origin and place.get("lat") is not None and place.get("lon") is not None:
+        score -= distance_km(origin[0], origin[1], place["lat"], place["lon"]) / DISTANCE_KM_PER_STAR
+    return score
+
+def build_search_plan(prefs, smart_keywords, meal_keyword):
+    """
+    Decides which Places searches to run for each dashboard section.
+    Returns {"cuisines": [(place_type, keyword), ...], "attractions": [...], "activities": [...]}
+    """
+    # Users who skipped the survey get generic searches for every section
+    if not prefs["cuisines"]:
+        return {
+            "cuisines": [("restaurant", meal_keyword)],
+            "attractions": [("tourist_attraction", "")],
+            "activities": [("tourist_attraction", "activity")],
+        }
+
+    return {
+        # We search specifically for what the ontology suggested
+        "cuisines": [("restaurant", key+" "+meal_keyword) for key in smart_keywords["cuisines"]],
+        "attractions": [("", key) for key in smart_keywords["attractions"]],
+        "activities": [("", key) for key in smart_keywords["activities"]],
+    }
+
+def fetch_dashboard_data(email, hour, meal_keyword, is_stale=lambda: False, on_batch=None):
+    """
+    Runs one dashboard refresh: context -> preferences -> ontology -> Places.
+    Returns a dict with the context, the three result lists and the searches
+    behind them (for loading more pages), or None if is_stale() says the
+    result is no longer wanted.
+    on_batch(section, places so far) is called from a worker thread each
+    time one of the section's searches finishes.
+    """
+    # A. Context Data (shares the lookup started at login if it's still running)
+    with perf_module.span("context.wait"):
+        context = fetch_context().result()
+    if is_stale():
+        return None
+
+    # B. User Preferences from DB (all three lists in one query)
+    prefs = db_module.get_user_preferences(email)
+
+    # Same weather bucket, time of day, place and preferences as a recent
+    # refresh or prefetch (e.g. only the temperature moved): skip the
+    # reasoning and the searches
+    inputs = recommendation_inputs(context, hour, meal_keyword, prefs)
+    remembered = _recall_places(email, inputs)
+    if remembered is not None:
+        perf_module.count("refresh.remembered")
+        return _dashboard_data(context, *remembered)
+
+    # C. ONTOLOGY REASONING
+    # We ask the ontology what to do based on Weather + Time + User Prefs
+    # (answers for every context are precomputed in assets/travel_ontology.recs.json)
+    # One call covers all three categories; each gets a list like ['museum', 'art gallery']
+    smart_keywords = recommend_all({"condition": context["condition"], "hour": hour}, prefs)
+
+    # Don't spend API calls on a refresh nobody will see
+    if is_stale():
+        return None
+
+    # D. Places Data
+    # Every search for the three sections is collected first and then run
+    # concurrently; each section is handed on as soon as any of its searches
+    # is in. Overlapping keywords find the same venues, so results are merged
+    # by place_id and ranked (see merge_places).
+    searches = build_search_plan(prefs, smart_keywords, meal_keyword)
+    origin = (context["lat"], context["lon"])
+    pages = {section: [None] * len(section_searches) for section, section_searches in searches.items()}
+    with perf_module.span("places.search_all"):
+        for section, index, section_places in stream_google_places_batch(context["lat"], context["lon"], searches):
+            pages[section][index] = section_places
+            if on_batch and not is_stale():
+                on_batch(section, merge_sections(pages, origin)[section])
+        places = merge_sections(pages, origin)
+
+    _remember_places(email, inputs, places, searches)
+    return _dashboard_data(context, places, searches)
+
+def prefetch_dashboard_data(email, hour, meal_keyword, budget=PREFETCH_API_BUDGET):
+    """
+    Runs a refresh ahead of time (e.g. for the next meal phase) so that the
+    real one is answered from memory. Only goes ahead if the Places searches
+    that aren't cached yet fit in `budget` API calls.
+    Returns (dashboard data or None, API calls left in the budget).
+    """
+    context = fetch_context().result()
+    prefs = db_module.get_user_preferences(email)
+    inputs = recommendation_inputs(context, hour, meal_keyword, prefs)
+    remembered = _recall_places(email, inputs)
+    if remembered is not None:
+        return _dashboard_data(context, *remembered), budget
+
+    smart_keywords = recommend_all({"condition": context["condition"], "hour": hour}, prefs)
+    searches = build_search_plan(prefs, smart_keywords, meal_keyword)
+    api_calls = sum(
+        not is_places_search_cached(context["lat"], context["lon"], place_type, keyword)
+        for section_searches in searches.values()
+        for place_type, keyword in section_searches
+    )
+    if api_calls > budget:
+        # Half a prefetch still leaves the phase change waiting on the network
+        return None, budget
+
+    pages = get_google_places_batch(context["lat"], context["lon"], searches)
+    places = merge_sections({section: [section_places] for section, section_places in pages.items()},
+                            (context["lat"], context["lon"]))
+    _remember_places(email, inputs, places, searches)
+    return _dashboard_data(context, places, searches), budget - api_calls
+
+def save_snapshot(email, meal_phase, data):
+    """
+    Keeps a refresh's dashboard for the next start and for offline use.
+    One where a section came back empty (e.g. a failed search) isn't kept.
+    """
+    if not all(data[section] for section in DASHBOARD_SECTIONS):
+        return
+    cell = geohash(data["lat"], data["lon"], GEOHASH_PRECISION["places"])
+    # Photo URLs carry the API key and are rebuilt on load
+    compact = dict(data)
+    for section in DASHBOARD_SECTIONS:
+        compact[section] = [{key: value for key, value in place.items() if key != "image"} for place in data[section]]
+    db_module.save_snapshot(email, cell, meal_phase, compact)
+
+def load_snapshot(email, meal_phase, cell=None):
+    """The last dashboard saved for the user and meal phase (in `cell` if given), or None."""
+    snapshot = db_module.get_latest_snapshot(email, meal_phase, cell)
+    if snapshot is None:
+        return None
+    data = snapshot[1]
+    for section in DASHBOARD_SECTIONS:
+        data[section] = [dict(place, image=build_photo_url(place.get("photo_reference"))) for place in data[section]]
+    return data
+
+def fill_from_snapshot(email, meal_phase, data):
+    """
+    Returns data with every empty section taken from the last snapshot of
+    the same place and meal phase (offline, the searches all come back empty).
+    """
+    empty = [section for section in DASHBOARD_SECTIONS if not data[section]]
+    if not empty:
+        return data
+    snapshot = load_snapshot(email, meal_phase, geohash(data["lat"], data["lon"], GEOHASH_PRECISION["places"]))
+    if snapshot is None:
+        return data
+    filled = dict(data)
+    for section in empty:
+        filled[section] = snapshot[section]
+    filled["searches"] = snapshot["searches"] if len(empty) == len(DASHBOARD_SECTIONS) else data["searches"]
+    return filled
+
+def section_fingerprint(places):
+    """What a section's cards show: place IDs, ratings and photos, in order."""
+    return tuple(
+        (place.get("place_id") or place["name"], place["rating"], place.get("photo_reference"))
+        for place in places
+    )
+
+def _dashboard_data(context, places, searches):
+    return {
+        "lat": context["lat"],
+        "lon": context["lon"],
+        "address": context["address"],
+        "temp": context["temp"],
+        "condition": context["condition"],
+        "restaurants": places["cuisines"],
+        "attractions": places["attractions"],
+        "activities": places["activities"],
+        "searches": searches,
+    }
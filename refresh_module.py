@@ -0,0 +1,85 @@
+import threading
+from kivy.clock import Clock
+import perf_module
+
+class RefreshScheduler():
+    """
+    Runs a screen's background refresh with at most one fetch in flight.
+
+    - request() can be called as often as you like: calls within `delay`
+      seconds collapse into one fetch, and calls made while a fetch is running
+      queue exactly one follow-up fetch.
+    - Every fetch is tagged with a generation number. A result is only applied
+      if no newer fetch was started and cancel() wasn't called in the meantime.
+    - cancel() drops the queued work and any result that's still in flight.
+
+    fetch(generation) runs on a worker thread and returns the result.
+    apply(result) runs on the main thread.
+    """
+    def __init__(self, fetch, apply, delay=0.2):
+        self.fetch = fetch
+        self.apply = apply
+        self._generation = 0
+        self._in_flight = False
+        self._pending = False
+        self._lock = threading.Lock()
+        self._trigger = Clock.create_trigger(self._start, delay)
+
+    def request(self):
+        """Asks for a refresh (coalesced with any other recent request)."""
+        self._trigger()
+
+    def cancel(self):
+        """Stops pending refreshes; a fetch already running finishes but is discarded."""
+        self._trigger.cancel()
+        with self._lock:
+            self._pending = False
+            self._generation += 1
+
+    def is_busy(self):
+        """True while a fetch is running or queued."""
+        with self._lock:
+            return self._in_flight or self._pending
+
+    def is_stale(self, generation):
+        """Lets a running fetch bail out early once its result would be dropped anyway."""
+        with self._lock:
+            return generation != self._generation
+
+    def _start(self, *args):
+        with self._lock:
+            if self._in_flight:
+                # Fold this request into a single follow-up fetch
+                self._pending = True
+                return
+            self._in_flight = True
+            self._generation += 1
+            generation = self._generation
+
+        threading.Thread(target=self._run, args=(generation,), daemon=True).start()
+
+    def _run(self, generation):
+        try:
+            result = self.fetch(generation)
+            failed = False
+        except Exception as e:
+            print(f"Refresh failed: {e}")
+            result = None
+            failed = True
+
+        Clock.schedule_once(lambda dt: self._finish(generation, result, failed))
+
+    def _finish(self, generation, result, failed):
+        with self._lock:
+            self._in_flight = False
+            is_current = generation == self._generation
+            run_again = self._pending
+            self._pending = False
+
+        if is_current and not failed:
+            self.apply(result)
+        elif not is_current:
+            perf_module.count("refresh.stale_dropped")
+
+        if run_again:
+            self._trigger()